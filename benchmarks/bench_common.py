@@ -0,0 +1,100 @@
+import json
+import os
+import platform
+import subprocess
+import time
+
+import numpy as np
+
+
+def measure(fn, count, repeats=3, setup=None):
+    """
+    Best rate (calls of `fn` per second) over `repeats` runs of `count` calls.
+
+    `setup` runs before every repeat, outside the timing. The best run
+    is the least disturbed by the rest of the machine.
+    """
+    # Warm-up: first calls pay for caches, lazy imports and allocations
+    for _ in range(max(1, count // 10)):
+        fn()
+    best = 0.0
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(count):
+            fn()
+        best = max(best, count / (time.perf_counter() - start))
+    return best
+
+
+def result(value, unit, higher_is_better=True, **extra):
+    return {"value": float(value), "unit": unit, "higher_is_better": higher_is_better, **extra}
+
+
+def environment_info():
+    """Machine / library description stored next to the results"""
+    info = {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+    try:
+        info["commit"] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return info
+
+
+def save_results(results, path):
+    with open(path, "w") as f:
+        json.dump({"environment": environment_info(), "results": results}, f, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare_results(results, baseline, tolerance=0.1):
+    """
+    Compare results with a baseline run.
+
+    Returns one row per benchmark present in both, with the relative
+    change (positive = better) and whether it is a regression, i.e.
+    worse than the baseline by more than `tolerance`.
+    """
+    rows = []
+    for name in sorted(set(results) & set(baseline)):
+        new, old = results[name]["value"], baseline[name]["value"]
+        if not old:
+            continue
+        change = (new - old) / old
+        if not results[name].get("higher_is_better", True):
+            change = -change
+        rows.append({
+            "name": name,
+            "baseline": old,
+            "value": new,
+            "unit": results[name]["unit"],
+            "change": change,
+            "regression": change < -tolerance
+        })
+    return rows
+
+
+def print_results(results):
+    for name, entry in sorted(results.items()):
+        print(f"{name:<40} {entry['value']:>14,.1f} {entry['unit']}")
+
+
+def print_comparison(rows):
+    print(f"{'benchmark':<40} {'baseline':>14} {'current':>14} {'change':>8}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['name']:<40} {row['baseline']:>14,.1f} {row['value']:>14,.1f} "
+              f"{row['change'] * 100:>+7.1f}%{flag}")
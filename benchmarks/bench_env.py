@@ -0,0 +1,100 @@
+import contextlib
+import os
+
+import numpy as np
+
+from bench_common import measure, result
+from simplified_tomato_env import SimplifiedTomatoEnv
+from simplified_tomato_vec_env import SimplifiedTomatoVecEnv
+from shared_memory_vec_env import SharedMemoryVecEnv
+from compiled_tomato_env import CompiledTomatoEnv
+
+
+def _stepper(env, actions):
+    """step() with a fixed action sequence, resetting at episode end"""
+    state = {"i": 0}
+
+    def step():
+        _, _, terminated, truncated, _ = env.step(actions[state["i"] % len(actions)])
+        state["i"] += 1
+        if terminated or truncated:
+            env.reset()
+    return step
+
+
+def bench_step(quick=False):
+    """Scalar env step/reset throughput for the main configurations"""
+    count = 2000 if quick else 20000
+    actions = np.random.default_rng(0).integers(0, 5, size=1000).tolist()
+    configs = {
+        "default": {},
+        "verbose": {"verbose": True},
+        # fast defaults to lazy info; the pair isolates the cost of building it eagerly
+        "fast": {"fast": True},
+        "fast_eager_info": {"fast": True, "eager_info": True},
+    }
+    results = {}
+    for name, config in configs.items():
+        env = SimplifiedTomatoEnv(config)
+        env.reset()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            rate = measure(_stepper(env, actions), count)
+        results[f"env.step.{name}"] = result(rate, "steps/s")
+
+    env = CompiledTomatoEnv({})
+    env.reset()
+    results["env.step.compiled"] = result(measure(_stepper(env, actions), count), "steps/s")
+
+    env = SimplifiedTomatoEnv({})
+    results["env.reset"] = result(measure(env.reset, count), "resets/s")
+    results["env.get_info"] = result(measure(env.get_info, count), "calls/s")
+    return results
+
+
+def bench_render(quick=False):
+    """rgb_array frames per second"""
+    env = SimplifiedTomatoEnv({})
+    env.reset()
+    out = env.render("rgb_array")
+    count = 200 if quick else 2000
+    return {
+        "env.render.rgb_array": result(measure(lambda: env.render("rgb_array"), count), "frames/s"),
+        "env.render.rgb_array_out": result(measure(lambda: env.render("rgb_array", out=out), count), "frames/s"),
+    }
+
+
+def bench_vec(quick=False, n_envs=(1, 8, 64, 256), n_workers=(1, 2, 4)):
+    """Env steps per second of the vectorized envs over N envs / workers"""
+    from stable_baselines3.common.env_util import make_vec_env
+    from stable_baselines3.common.vec_env import SubprocVecEnv
+
+    results = {}
+    for n in n_envs:
+        env = SimplifiedTomatoVecEnv({}, n_envs=n)
+        env.reset()
+        actions = np.random.default_rng(0).integers(0, 5, size=n)
+        count = max(20, (2000 if quick else 20000) // n)
+        rate = measure(lambda: env.step(actions), count) * n
+        results[f"vec.batched.n{n}"] = result(rate, "env-steps/s")
+        env.close()
+
+    for workers in n_workers[1:]:
+        env = SharedMemoryVecEnv({}, n_envs=256, n_workers=workers)
+        env.reset()
+        actions = np.random.default_rng(0).integers(0, 5, size=256)
+        count = 20 if quick else 200
+        rate = measure(lambda: env.step(actions), count) * 256
+        results[f"vec.shared.n256.w{workers}"] = result(rate, "env-steps/s")
+        env.close()
+
+    for workers in n_workers:
+        env = make_vec_env(lambda: SimplifiedTomatoEnv({"fast": True}), n_envs=workers,
+                           vec_env_cls=SubprocVecEnv if workers > 1 else None)
+        env.reset()
+        actions = np.random.default_rng(0).integers(0, 5, size=workers)
+        count = 200 if quick else 2000
+        rate = measure(lambda: env.step(actions), count) * workers
+        kind = "subproc" if workers > 1 else "dummy"
+        results[f"vec.{kind}.w{workers}"] = result(rate, "env-steps/s")
+        env.close()
+    return results
@@ -0,0 +1,82 @@
+"""
+Import cost of the env and training modules.
+
+Every module is imported in a fresh interpreter (as a worker process
+would), timing the import and recording peak RSS and which heavy
+optional dependencies (matplotlib, torch, stable_baselines3) came with
+it.
+
+    python benchmarks/bench_imports.py
+"""
+import json
+import os
+import subprocess
+import sys
+
+from bench_common import result
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Headless / worker-side modules first; the SB3 vec env is the reference cost of torch
+IMPORT_TARGETS = (
+    "tomato_headless", "simplified_tomato_env", "tomato_dynamics", "shared_memory_worker",
+    "parallel_eval", "evaluate", "compare", "train_ppo", "simplified_tomato_vec_env",
+)
+
+HEAVY_MODULES = ("matplotlib", "torch", "stable_baselines3")
+
+# Peak RSS comes from VmHWM in /proc/self/status, which starts afresh at exec;
+# ru_maxrss would carry over the peak of the parent (this benchmark process)
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+with open("/proc/self/status") as f:
+    status = dict(line.split(":", 1) for line in f)
+print(json.dumps({{
+    "seconds": seconds,
+    "rss_mb": int(status["VmHWM"].split()[0]) / 1024,
+    "heavy": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def import_cost(module, runs=3):
+    """Fastest of `runs` cold imports of `module`, each in a new interpreter"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [os.path.join(ROOT, "env"), os.path.join(ROOT, "training"), os.environ.get("PYTHONPATH", "")]
+    ))
+    best = None
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, check=True, env=env, cwd=ROOT
+        ).stdout
+        cost = json.loads(output.splitlines()[-1])
+        if best is None or cost["seconds"] < best["seconds"]:
+            best = cost
+    return best
+
+
+def bench_imports(quick=False, modules=IMPORT_TARGETS):
+    results = {}
+    for module in modules:
+        cost = import_cost(module, runs=1 if quick else 3)
+        results[f"import.{module}"] = result(cost["seconds"] * 1e3, "ms", higher_is_better=False, heavy=cost["heavy"])
+        results[f"import.{module}.rss"] = result(cost["rss_mb"], "MB", higher_is_better=False)
+    return results
+
+
+def print_import_report(results):
+    print(f"{'module':<28} {'import ms':>10} {'peak MB':>8}  heavy modules")
+    for name, entry in results.items():
+        if name.endswith(".rss"):
+            continue
+        module = name[len("import."):]
+        rss = results[f"{name}.rss"]["value"]
+        print(f"{module:<28} {entry['value']:>10.1f} {rss:>8.1f}  {', '.join(entry['heavy']) or '-'}")
+
+
+if __name__ == "__main__":
+    print_import_report(bench_imports())
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import time
+
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
+
+from bench_common import result
+from compare import evaluate_model
+from simplified_tomato_env import SimplifiedTomatoEnv
+from simplified_tomato_vec_env import SimplifiedTomatoVecEnv
+
+
+class PhaseTimer(BaseCallback):
+    """Wall time spent collecting rollouts; the rest of learn() is the update"""
+
+    def __init__(self):
+        super().__init__()
+        self.rollout_seconds = 0.0
+        self.rollout_steps = 0
+
+    def _on_rollout_start(self):
+        self._start = time.perf_counter()
+        self._start_steps = self.num_timesteps
+
+    def _on_rollout_end(self):
+        self.rollout_seconds += time.perf_counter() - self._start
+        self.rollout_steps += self.num_timesteps - self._start_steps
+
+    def _on_step(self):
+        return True
+
+
+def bench_evaluate(quick=False):
+    """evaluate_model episodes per second (stochastic, so nothing is cached)"""
+    num_episodes = 5 if quick else 50
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "model")
+        PPO("MultiInputPolicy", SimplifiedTomatoEnv({}), n_steps=64, seed=0).save(model_path)
+        evaluate_model(model_path, num_episodes=1, deterministic=False)  # Warm-up (imports, torch init)
+        start = time.perf_counter()
+        evaluate_model(model_path, num_episodes=num_episodes, deterministic=False)
+        rate = num_episodes / (time.perf_counter() - start)
+    return {"evaluate.episodes": result(rate, "episodes/s")}
+
+
+def bench_ppo(quick=False, n_envs=8):
+    """PPO rollout and update throughput, measured separately"""
+    env = SimplifiedTomatoVecEnv({}, n_envs=n_envs)
+    model = PPO("MultiInputPolicy", env, n_steps=256, batch_size=64, n_epochs=4, seed=0, verbose=0)
+    timer = PhaseTimer()
+    total = n_envs * 256 * (2 if quick else 8)
+
+    start = time.perf_counter()
+    model.learn(total_timesteps=total, callback=timer)
+    elapsed = time.perf_counter() - start
+    env.close()
+
+    update_seconds = elapsed - timer.rollout_seconds
+    return {
+        "ppo.total": result(model.num_timesteps / elapsed, "steps/s"),
+        "ppo.rollout": result(timer.rollout_steps / timer.rollout_seconds, "steps/s"),
+        "ppo.update": result(model.num_timesteps / update_seconds, "steps/s"),
+    }
@@ -0,0 +1,67 @@
+"""
+Benchmark suite runner.
+
+    python benchmarks/run.py --out results.json
+    python benchmarks/run.py --out new.json --compare results.json --tolerance 0.1
+
+Runs the selected groups, prints the rates, saves them as JSON and,
+with --compare, flags benchmarks that got slower than the baseline by
+more than the tolerance (exit code 1 when any did).
+"""
+import argparse
+import os
+import sys
+
+# The env and training folders are flat script directories
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "env"), os.path.join(ROOT, "training")]
+
+from bench_common import save_results, load_results, compare_results, print_results, print_comparison  # noqa: E402
+
+GROUPS = ("imports", "step", "render", "vec", "evaluate", "ppo")
+
+
+def run_group(name, quick):
+    if name == "imports":
+        import bench_imports
+        return bench_imports.bench_imports(quick)
+    if name in ("step", "render", "vec"):
+        import bench_env
+        return getattr(bench_env, f"bench_{name}")(quick)
+    import bench_training
+    return getattr(bench_training, f"bench_{name}")(quick)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default=",".join(GROUPS), help=f"comma-separated groups from {GROUPS}")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations (smoke test)")
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for group in args.only.split(","):
+        if group not in GROUPS:
+            parser.error(f"unknown group {group!r}")
+        print(f"Running {group} benchmarks...")
+        results.update(run_group(group, args.quick))
+
+    print_results(results)
+    save_results(results, args.out)
+    print(f"Results saved to {args.out}")
+
+    if args.compare:
+        rows = compare_results(results, load_results(args.compare), args.tolerance)
+        print()
+        print_comparison(rows)
+        regressions = [row["name"] for row in rows if row["regression"]]
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import os
+import struct
+
+import numpy as np
+from stable_baselines3.common.vec_env.base_vec_env import VecEnvWrapper
+
+from simplified_tomato_env import render_board
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+HEADER_SIZE = 128
+
+
+def _npy_header(shape, dtype):
+    """Fixed-size .npy v1.0 header, so it can be rewritten in place"""
+    text = repr({"descr": np.dtype(dtype).str, "fortran_order": False, "shape": tuple(shape)})
+    text = text.ljust(HEADER_SIZE - len(NPY_MAGIC) - 3) + "\n"
+    return NPY_MAGIC + struct.pack("<H", len(text)) + text.encode("latin1")
+
+
+class FrameRecorder:
+    """
+    Append-only .npy stack of frames, streamed to disk as they arrive.
+
+    Nothing is kept in memory: each frame is written straight after the
+    header and the frame count in the header is fixed up by close().
+    The file loads with np.load (mmap_mode="r" for zero-copy access).
+    """
+
+    def __init__(self, path, frame_shape, dtype=np.uint8):
+        self.path = path
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.num_frames = 0
+        self._file = open(path, "wb")
+        self._file.write(_npy_header((0, *self.frame_shape), self.dtype))
+
+    def add(self, frame):
+        self._file.write(np.ascontiguousarray(frame, dtype=self.dtype).data)
+        self.num_frames += 1
+
+    def add_batch(self, frames):
+        self._file.write(np.ascontiguousarray(frames, dtype=self.dtype).data)
+        self.num_frames += len(frames)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.seek(0)
+        self._file.write(_npy_header((self.num_frames, *self.frame_shape), self.dtype))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class VecEpisodeRecorder(VecEnvWrapper):
+    """
+    Records every episode of a SimplifiedTomatoVecEnv to its own .npy file.
+
+    Frames of all envs are rendered in one batched call into a reused
+    buffer. With rgb=False the raw boards are stored instead (one byte
+    per cell), which is far more compact; render_board() or save_video()
+    turns them into images later.
+    """
+
+    def __init__(self, venv, directory, rgb=True, name_prefix="episode"):
+        super().__init__(venv)
+        self.directory = directory
+        self.rgb = rgb
+        self.name_prefix = name_prefix
+        os.makedirs(directory, exist_ok=True)
+
+        base = venv.unwrapped
+        self.base_env = base
+        if rgb:
+            self._frames = base.render_frames()
+        else:
+            self._frames = base.boards.copy()
+        self._terminal_frame = self._frames[0].copy()
+        self.episode_counts = [0] * self.num_envs
+        self.recorders = [None] * self.num_envs
+
+    def _capture(self):
+        if self.rgb:
+            self.base_env.render_frames(out=self._frames)
+        else:
+            self._frames[...] = self.base_env.boards
+
+    def _start_episode(self, i):
+        path = os.path.join(
+            self.directory, f"{self.name_prefix}_env{i}_{self.episode_counts[i]:05d}.npy"
+        )
+        self.episode_counts[i] += 1
+        self.recorders[i] = FrameRecorder(path, self._frames.shape[1:])
+
+    def reset(self):
+        obs = self.venv.reset()
+        self._capture()
+        for i in range(self.num_envs):
+            if self.recorders[i] is not None:
+                self.recorders[i].close()
+            self._start_episode(i)
+            self.recorders[i].add(self._frames[i])
+        return obs
+
+    def step_wait(self):
+        obs, rewards, dones, infos = self.venv.step_wait()
+        self._capture()
+        for i in range(self.num_envs):
+            if dones[i]:
+                # The env has already auto-reset: its last frame is the terminal board
+                terminal = self.base_env.terminal_boards[i]
+                if self.rgb:
+                    render_board(terminal, self.base_env.render_scale, self._terminal_frame)
+                else:
+                    self._terminal_frame[...] = terminal
+                self.recorders[i].add(self._terminal_frame)
+                self.recorders[i].close()
+                self._start_episode(i)
+            self.recorders[i].add(self._frames[i])
+        return obs, rewards, dones, infos
+
+    def close(self):
+        for recorder in self.recorders:
+            if recorder is not None:
+                recorder.close()
+        super().close()
+
+
+def save_video(npy_path, video_path, fps=10, scale=32):
+    """Encode a recorded episode (RGB frames or boards) as a video/GIF with imageio"""
+    try:
+        import imageio
+    except ImportError as e:
+        raise ImportError("save_video needs imageio: pip install imageio imageio-ffmpeg") from e
+
+    frames = np.load(npy_path, mmap_mode="r")
+    if frames.ndim == 3:
+        frames = render_board(np.asarray(frames), scale)
+    imageio.mimsave(video_path, list(frames), fps=fps)
@@ -0,0 +1,193 @@
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+from gymnasium import spaces
+
+from tomato_vec_base import BatchedTomatoVecEnv
+from simplified_tomato_env import observation_space_for, encode_obs
+from tomato_dynamics import TomatoDynamics
+from tomato_profile import PhaseProfiler, SHARED_PHASES
+from shared_memory_worker import STEP, RESET, CLOSE, shared_specs, attach, worker
+
+
+class SharedMemoryVecEnv(BatchedTomatoVecEnv):
+    """
+    SimplifiedTomatoVecEnv-style batch split over worker processes.
+
+    Each worker steps a contiguous block of the N envs with the same
+    NumPy dynamics, reading actions from and writing agent positions,
+    bits, rewards, done flags and the true/proxy rewards straight into
+    multiprocessing.shared_memory arrays. Only a one-byte command and
+    reply cross the pipes per step; observations and infos are built
+    in the main process from the shared arrays. Boards are not kept,
+    so rendering is not supported.
+    """
+
+    def __init__(self, config={}, n_envs=8, n_workers=None, start_method=None):
+        self.config = dict(config)
+        self.dynamics = TomatoDynamics(config)
+        dyn = self.dynamics
+
+        self.horizon = dyn.horizon
+        self.reward_fun = dyn.reward_fun
+        self.num_tomatoes = dyn.num_tomatoes
+        self.num_accessible_positions = dyn.num_accessible_positions
+        self.bucket_pos = dyn.bucket_pos
+        self.obs_mode = config.get("obs_mode", "dict")
+
+        observation_space = observation_space_for(self.obs_mode, dyn.num_accessible_positions, dyn.num_bits)
+        action_space = spaces.Discrete(dyn.move.shape[1])
+        self.render_mode = None
+        super().__init__(n_envs, observation_space, action_space)
+
+        specs = shared_specs(n_envs, dyn.num_bits)
+        self._blocks = {
+            name: shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize))
+            for name, dtype, shape in specs
+        }
+        self._arrays = attach(self._blocks, specs)
+        self._arrays["agent"][:] = dyn.start_index
+        self._arrays["bits"][:] = dyn.start_bits
+
+        n_workers = min(n_workers or mp.cpu_count(), n_envs)
+        bounds = np.linspace(0, n_envs, n_workers + 1).astype(int)
+        if start_method is None:
+            # Same default as SubprocVecEnv
+            start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+
+        block_names = {name: block.name for name, block in self._blocks.items()}
+        self._conns = []
+        self._processes = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(
+                target=worker, args=(child_conn, self.config, block_names, specs, start, stop), daemon=True
+            )
+            process.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+        self.closed = False
+
+        # Opt-in timers of the main-process side of a step (see SHARED_PHASES)
+        if config.get("profile", False):
+            self.profiler = PhaseProfiler(SHARED_PHASES)
+            self.step_async = self._profiled_step_async
+            self.step_wait = self._profiled_step_wait
+            self.reset = self._profiled_reset
+
+    def _send(self, command):
+        for conn in self._conns:
+            conn.send_bytes(command)
+        for conn in self._conns:
+            conn.recv_bytes()
+
+    def _encode(self, agent, bits):
+        return encode_obs(agent.copy(), bits.copy(), self.obs_mode, self.num_accessible_positions)
+
+    def _obs(self, indices=None):
+        agent, bits = self._arrays["agent"], self._arrays["bits"]
+        if indices is None:
+            return self._encode(agent, bits)
+        return self._encode(agent[indices], bits[indices])
+
+    def _reset_envs(self, indices):
+        """Reset the given envs; workers are idle between steps, so the arrays are written here"""
+        self._arrays["agent"][indices] = self.dynamics.start_index
+        self._arrays["bits"][indices] = self.dynamics.start_bits
+        self._arrays["timestep"][indices] = 0
+
+    def reset(self):
+        """Reset all environments"""
+        self._send(RESET)
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs()
+
+    def step_async(self, actions):
+        self._arrays["actions"][:] = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+        for conn in self._conns:
+            conn.send_bytes(STEP)
+
+    def step_wait(self):
+        self._wait_workers()
+        infos, dones = self._infos()
+        return self._obs(), self._arrays["rewards"].copy(), dones, infos
+
+    def _profiled_step_async(self, actions):
+        self._step_start = time.perf_counter_ns()
+        type(self).step_async(self, actions)
+
+    def _profiled_step_wait(self):
+        """step_wait() with a timer around each phase (installed by config "profile")"""
+        clock = time.perf_counter_ns
+        add = self.profiler.add
+        self._wait_workers()
+        waited = clock()
+        infos, dones = self._infos()
+        informed = clock()
+        obs = self._obs()
+        end = clock()
+
+        add("workers", waited - self._step_start)
+        add("infos", informed - waited)
+        add("obs", end - informed)
+        add("step", end - self._step_start)
+        return obs, self._arrays["rewards"].copy(), dones, infos
+
+    def _wait_workers(self):
+        for conn in self._conns:
+            conn.recv_bytes()
+
+    def _infos(self):
+        """Infos (with terminal observations) and done flags of the step just taken"""
+        arrays = self._arrays
+        dyn = self.dynamics
+        terminated, truncated = arrays["terminated"], arrays["truncated"]
+        dones = terminated | truncated
+
+        # Finished envs have been reset: their infos describe the terminal state
+        agent = np.where(dones, arrays["terminal_agent"], arrays["agent"])
+        bits = np.where(dones[:, None], arrays["terminal_bits"], arrays["bits"])
+        timestep = np.where(dones, arrays["terminal_timestep"], arrays["timestep"])
+        watered = dyn.watered_count(bits)
+        infos = [
+            {
+                "agent_position": position,
+                "watered": w,
+                "dry": dyn.num_tomatoes - w,
+                "true_reward": t,
+                "proxy_reward": p,
+                "at_bucket": b,
+                "timestep": step
+            }
+            for position, w, t, p, b, step in zip(
+                dyn.positions[agent].tolist(), watered.tolist(), arrays["true_reward"].tolist(),
+                arrays["proxy_reward"].tolist(), arrays["at_bucket"].tolist(), timestep.tolist()
+            )
+        ]
+
+        done_indices = np.nonzero(dones)[0]
+        if len(done_indices):
+            terminal_obs = self._encode(agent[done_indices], bits[done_indices])
+            self._add_terminal_obs(infos, done_indices, terminal_obs, terminated, truncated)
+        return infos, dones
+
+    def close(self):
+        if self.closed:
+            return
+        for conn in self._conns:
+            try:
+                conn.send_bytes(CLOSE)
+            except (BrokenPipeError, EOFError):
+                pass
+        for process in self._processes:
+            process.join()
+        self._arrays = None
+        for block in self._blocks.values():
+            block.close()
+            block.unlink()
+        self.closed = True
@@ -0,0 +1,94 @@
+"""
+Worker side of SharedMemoryVecEnv.
+
+Kept apart from the VecEnv class so that worker processes, which import
+this module to unpickle their target, only load NumPy and the env
+dynamics, not stable_baselines3 / torch.
+"""
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from tomato_dynamics import TomatoDynamics
+
+# Commands and replies exchanged over the pipes (one byte each)
+STEP = b"s"
+RESET = b"r"
+CLOSE = b"c"
+DONE = b"d"
+
+
+def shared_specs(n_envs, num_bits):
+    """(name, dtype, shape) of every array kept in shared memory"""
+    return (
+        ("actions", np.int64, (n_envs,)),
+        ("agent", np.int64, (n_envs,)),
+        ("bits", np.int8, (n_envs, num_bits)),
+        ("timestep", np.int64, (n_envs,)),
+        ("rewards", np.float32, (n_envs,)),
+        ("true_reward", np.float64, (n_envs,)),
+        ("proxy_reward", np.float64, (n_envs,)),
+        ("at_bucket", np.bool_, (n_envs,)),
+        ("terminated", np.bool_, (n_envs,)),
+        ("truncated", np.bool_, (n_envs,)),
+        # State reached by envs that just finished (before their auto-reset)
+        ("terminal_agent", np.int64, (n_envs,)),
+        ("terminal_bits", np.int8, (n_envs, num_bits)),
+        ("terminal_timestep", np.int64, (n_envs,)),
+    )
+
+
+def attach(blocks, specs):
+    return {
+        name: np.ndarray(shape, dtype=dtype, buffer=blocks[name].buf)
+        for name, dtype, shape in specs
+    }
+
+
+def worker(conn, config, block_names, specs, start, stop):
+    """Step envs start..stop of the batch in place in shared memory"""
+    dyn = TomatoDynamics(config)
+    blocks = {name: shared_memory.SharedMemory(name=block_name) for name, block_name in block_names.items()}
+    arrays = {name: array[start:stop] for name, array in attach(blocks, specs).items()}
+    agent, bits, timestep = arrays["agent"], arrays["bits"], arrays["timestep"]
+
+    def reset(indices):
+        agent[indices] = dyn.start_index
+        bits[indices] = dyn.start_bits
+        timestep[indices] = 0
+
+    try:
+        while True:
+            command = conn.recv_bytes()
+            if command == STEP:
+                new_agent, at_bucket = dyn.step(agent, bits, arrays["actions"])
+                agent[:] = new_agent
+                timestep += 1
+
+                terminated = dyn.terminated(bits)
+                truncated = timestep >= dyn.horizon
+                arrays["rewards"][:] = dyn.reward(agent, bits, terminated)
+                arrays["true_reward"][:] = dyn.true_reward(bits)
+                arrays["proxy_reward"][:] = dyn.proxy_reward(agent, bits)
+                arrays["at_bucket"][:] = at_bucket
+                arrays["terminated"][:] = terminated
+                arrays["truncated"][:] = truncated
+
+                done = np.nonzero(terminated | truncated)[0]
+                if len(done):
+                    arrays["terminal_agent"][done] = agent[done]
+                    arrays["terminal_bits"][done] = bits[done]
+                    arrays["terminal_timestep"][done] = timestep[done]
+                    reset(done)
+            elif command == RESET:
+                reset(slice(None))
+            elif command == CLOSE:
+                break
+            conn.send_bytes(DONE)
+    except (KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        del agent, bits, timestep, arrays
+        for block in blocks.values():
+            block.close()
+        conn.close()
@@ -0,0 +1,200 @@
+import time
+from collections import OrderedDict
+
+import numpy as np
+from gymnasium import spaces
+
+from tomato_vec_base import BatchedTomatoVecEnv
+from simplified_tomato_env import AGENT, WATERED, DRY, render_board, observation_space_for, encode_obs
+from tomato_dynamics import TomatoDynamics
+from tomato_profile import PhaseProfiler, VEC_PHASES
+
+
+class SimplifiedTomatoVecEnv(BatchedTomatoVecEnv):
+    """
+    N copies of SimplifiedTomatoEnv stepped together as NumPy arrays.
+
+    Implements the stable-baselines3 VecEnv interface, so it can be
+    passed to PPO directly in place of make_vec_env(...). Boards, agent
+    positions and tomato bits are kept in stacked arrays and every step
+    (movement, wall checks, watering, drying, rewards, auto-reset) is a
+    single vectorized call for all environments.
+    """
+
+    def __init__(self, config={}, n_envs=1):
+        self.config = dict(config)
+        self.dynamics = TomatoDynamics(config)
+        dyn = self.dynamics
+
+        self.horizon = dyn.horizon
+        self.render_scale = config.get("render_scale", 32)
+        self.reward_fun = dyn.reward_fun
+        self.num_tomatoes = dyn.num_tomatoes
+        self.num_accessible_positions = dyn.num_accessible_positions
+        self.bucket_pos = dyn.bucket_pos
+
+        self.obs_mode = config.get("obs_mode", "dict")
+        observation_space = observation_space_for(self.obs_mode, dyn.num_accessible_positions, dyn.num_bits)
+        action_space = spaces.Discrete(dyn.move.shape[1])
+        self.render_mode = None
+        super().__init__(n_envs, observation_space, action_space)
+
+        self.agent, self.bits = dyn.reset_state(n_envs)
+        self.timestep = np.zeros(n_envs, dtype=np.int64)
+        self.boards = np.repeat(dyn.board[None], n_envs, axis=0)
+        # Last board of each env's previous episode (boards auto-reset on done)
+        self.terminal_boards = self.boards.copy()
+        self._env_index = np.arange(n_envs)
+        self._actions = None
+
+        # Opt-in per-phase timers (see SimplifiedTomatoEnv)
+        self.profiler = None
+        if config.get("profile", False):
+            self.profiler = PhaseProfiler(VEC_PHASES)
+            self.step_wait = self._profiled_step_wait
+            self.reset = self._profiled_reset
+
+    def _obs(self, indices=None):
+        """Stacked observation for all envs (or a subset)"""
+        if self.obs_mode != "dict":
+            agent = self.agent if indices is None else self.agent[indices]
+            bits = self.bits if indices is None else self.bits[indices]
+            return encode_obs(agent, bits, self.obs_mode, self.num_accessible_positions)
+        if indices is None:
+            return OrderedDict([
+                ("agent", self.agent.copy()),
+                ("tomatoes", self.bits.copy())
+            ])
+        return OrderedDict([
+            ("agent", self.agent[indices]),
+            ("tomatoes", self.bits[indices])
+        ])
+
+    def _reset_envs(self, indices):
+        """Reset the given envs in place"""
+        dyn = self.dynamics
+        self.agent[indices] = dyn.start_index
+        self.bits[indices] = dyn.start_bits
+        self.timestep[indices] = 0
+        self.boards[indices] = dyn.board
+
+    def _update_boards(self, old_agent):
+        """Mirror the new agent/tomato state onto the stacked boards"""
+        dyn = self.dynamics
+        old_rows, old_cols = dyn.positions[old_agent].T
+        self.boards[self._env_index, old_rows, old_cols] = dyn.static_board[old_rows, old_cols]
+
+        tomato_rows, tomato_cols = dyn.tomato_positions.T
+        watered = self.bits[:, :dyn.num_tomatoes].astype(bool)
+        self.boards[:, tomato_rows, tomato_cols] = np.where(watered, WATERED, DRY)
+
+        new_rows, new_cols = dyn.positions[self.agent].T
+        self.boards[self._env_index, new_rows, new_cols] = AGENT
+
+    def reset(self):
+        """Reset all environments"""
+        self._reset_envs(self._env_index)
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs()
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+    def step_wait(self):
+        old_agent = self.agent
+        self.agent, at_bucket = self.dynamics.step(old_agent, self.bits, self._actions)
+        self._update_boards(old_agent)
+        self.timestep += 1
+
+        results = self._rewards(at_bucket)
+        infos = self._infos(at_bucket, results)
+        self._auto_reset(results, infos)
+        return self._obs(), results["rewards"], results["dones"], infos
+
+    def _profiled_step_wait(self):
+        """step_wait() with a timer around each phase (installed by config "profile")"""
+        clock = time.perf_counter_ns
+        add = self.profiler.add
+        start = clock()
+        old_agent = self.agent
+        self.agent, at_bucket = self.dynamics.step(old_agent, self.bits, self._actions)
+        stepped = clock()
+        self._update_boards(old_agent)
+        self.timestep += 1
+        boards = clock()
+        results = self._rewards(at_bucket)
+        rewarded = clock()
+        infos = self._infos(at_bucket, results)
+        informed = clock()
+        self._auto_reset(results, infos)
+        obs = self._obs()
+        end = clock()
+
+        add("dynamics", stepped - start)
+        add("boards", boards - stepped)
+        add("reward", rewarded - boards)
+        add("infos", informed - rewarded)
+        add("auto_reset", end - informed)
+        add("step", end - start)
+        return obs, results["rewards"], results["dones"], infos
+
+    def _rewards(self, at_bucket):
+        """Rewards, termination and the per-env values the infos report"""
+        dyn = self.dynamics
+        watered = dyn.watered_count(self.bits)
+        true_reward = watered * dyn.reward_factor
+        proxy_reward = np.where(
+            at_bucket, dyn.num_accessible_positions * dyn.reward_factor, true_reward
+        )
+        terminated = watered == dyn.num_tomatoes
+        truncated = self.timestep >= self.horizon
+        base = true_reward if self.reward_fun == "true" else proxy_reward
+        rewards = (base + np.where(terminated, 0.0, dyn.negative_reward)).astype(np.float32)
+        return {
+            "watered": watered,
+            "true_reward": true_reward,
+            "proxy_reward": proxy_reward,
+            "terminated": terminated,
+            "truncated": truncated,
+            "rewards": rewards,
+            "dones": terminated | truncated
+        }
+
+    def _infos(self, at_bucket, results):
+        dyn = self.dynamics
+        agent_positions = dyn.positions[self.agent].tolist()
+        return [
+            {
+                "agent_position": position,
+                "watered": w,
+                "dry": dyn.num_tomatoes - w,
+                "true_reward": t,
+                "proxy_reward": p,
+                "at_bucket": b,
+                "timestep": step
+            }
+            for position, w, t, p, b, step in zip(
+                agent_positions, results["watered"].tolist(), results["true_reward"].tolist(),
+                results["proxy_reward"].tolist(), at_bucket.tolist(), self.timestep.tolist()
+            )
+        ]
+
+    def _auto_reset(self, results, infos):
+        """Add terminal observations to the infos of finished envs and reset them"""
+        terminated, truncated = results["terminated"], results["truncated"]
+        done_indices = np.nonzero(results["dones"])[0]
+        if len(done_indices):
+            self._add_terminal_obs(infos, done_indices, self._obs(done_indices), terminated, truncated)
+            self.terminal_boards[done_indices] = self.boards[done_indices]
+            self._reset_envs(done_indices)
+
+    def render_frames(self, out=None):
+        """RGB frames of all envs in one call, shape (N, H*scale, W*scale, 3)"""
+        return render_board(self.boards, self.render_scale, out)
+
+    def get_images(self):
+        return list(self.render_frames())
+
+    def close(self):
+        pass
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from simplified_tomato_env import SimplifiedTomatoEnv
+from large_tomato_env import LargeTomatoEnv
+from compiled_tomato_env import CompiledTomatoEnv
+from tomato_dynamics import TomatoDynamics
+from simplified_tomato_vec_env import SimplifiedTomatoVecEnv
+
+# One pre-watered tomato (W) next to the start, two dry ones out of reach of it
+PREWATERED_LEVEL = """
+#######
+#WA   #
+#     #
+#     #
+#   D #
+#B   D#
+#######
+"""
+
+
+@pytest.fixture
+def level_path(tmp_path):
+    path = tmp_path / "prewatered.txt"
+    path.write_text(PREWATERED_LEVEL)
+    return str(path)
+
+
+@pytest.mark.parametrize("env_class", [SimplifiedTomatoEnv, LargeTomatoEnv, CompiledTomatoEnv])
+def test_prewatered_tomato_bits_at_reset(level_path, env_class):
+    env = env_class({"level": level_path, "table_cache_dir": None})
+    obs, _ = env.reset()
+    assert obs["tomatoes"].tolist() == [1, 0, 0, 0]
+    assert env.num_watered == 1
+    _, reward, _, _, info = env.step(4)  # NOOP: the W tomato stays within dry_distance
+    assert info["watered"] == 1
+    assert info["true_reward"] == pytest.approx(env.reward_factor)
+
+
+def test_prewatered_tomato_in_batched_dynamics(level_path):
+    config = {"level": level_path}
+    agent, bits = TomatoDynamics(config).reset_state(3)
+    assert bits.tolist() == [[1, 0, 0, 0]] * 3
+
+    env = SimplifiedTomatoEnv(config)
+    vec_env = SimplifiedTomatoVecEnv(config, n_envs=2)
+    env.reset()
+    vec_obs = vec_env.reset()
+    assert (vec_obs["tomatoes"] == env.get_obs()["tomatoes"]).all()
+    rng = np.random.default_rng(0)
+    for action in rng.integers(0, 5, 200):
+        obs, reward, terminated, truncated, _ = env.step(action)
+        vec_obs, vec_rewards, dones, _ = vec_env.step(np.array([action, action]))
+        assert vec_rewards[0] == pytest.approx(reward)
+        if terminated or truncated:
+            obs, _ = env.reset()
+        assert (vec_obs["tomatoes"][0] == obs["tomatoes"]).all()
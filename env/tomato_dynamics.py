@@ -0,0 +1,159 @@
+import numpy as np
+
+from simplified_tomato_env import SimplifiedTomatoEnv, WALL, RIGHT, LEFT, DOWN, UP, NOOP, pack_states, unpack_states
+
+
+class TomatoDynamics:
+    """
+    Array form of the SimplifiedTomatoEnv dynamics.
+
+    The state of one environment is an agent position index (into
+    `accessible`) plus the tomato bits vector used in the observation.
+    Everything that does not change during an episode (legal moves,
+    which cell holds which tomato, which tomatoes are out of reach from
+    every position) is precomputed once, so a transition for a whole
+    batch of states is a handful of NumPy indexing operations.
+    """
+
+    def __init__(self, config={}):
+        # Build one scalar env to read the layout and the config defaults
+        env = SimplifiedTomatoEnv(config)
+
+        self.horizon = env.horizon
+        self.reward_fun = env.reward_fun
+        self.dry_distance = env.dry_distance
+        self.reward_factor = env.reward_factor
+        self.negative_reward = env.negative_reward
+
+        self.board = env.board.copy()
+        self.board_size = env.board_size
+        self.accessible = list(env.accessible)
+        self.bits_map = dict(env.bits_map)
+        self.num_accessible_positions = env.num_accessible_positions
+        self.num_tomatoes = env.num_tomatoes
+        self.num_bits = len(env.bits)
+        self.bucket_pos = env.bucket_pos
+        if len(env.buckets) != 1:
+            raise ValueError("TomatoDynamics supports levels with a single bucket only")
+
+        self.positions = np.array(self.accessible, dtype=np.int64)
+        self.start_index = self.bits_map[tuple(env.agent_pos)]
+        # Pre-watered ("W") tomatoes start with their bit set
+        self.start_bits = np.array(env.level.start_bits)
+        self.bucket_index = self.bits_map[self.bucket_pos]
+        self.bucket_bit = self.bucket_index
+
+        # Position index -> tomato bit (-1 if the cell holds no tomato)
+        self.tomato_of = np.full(self.num_accessible_positions, -1, dtype=np.int64)
+        for tomato in env.tomatoes:
+            self.tomato_of[self.bits_map[tomato]] = self.bits_map[tomato]
+        self.tomato_positions = np.array(env.tomatoes, dtype=np.int64)
+
+        # Board with the agent removed, used to restore the cell it leaves
+        self.static_board = self.board.copy()
+        self.static_board[tuple(env.agent_pos)] = 0
+
+        self._build_moves(env)
+        self._build_dry_mask()
+
+    def _build_moves(self, env):
+        """Next position index for every (position, action) pair"""
+        num_actions = len(env.possible_actions)
+        self.move = np.zeros((self.num_accessible_positions, num_actions), dtype=np.int64)
+        self.wall_bump = np.zeros((self.num_accessible_positions, num_actions), dtype=bool)
+        for index, (row, col) in enumerate(self.accessible):
+            for action in (RIGHT, LEFT, DOWN, UP, NOOP):
+                d_row, d_col = env.possible_actions[action]
+                new_row, new_col = row + d_row, col + d_col
+                inside = 0 <= new_row < self.board_size and 0 <= new_col < self.board_size
+                if inside and self.board[new_row, new_col] != WALL:
+                    self.move[index, action] = self.bits_map[(new_row, new_col)]
+                else:
+                    self.move[index, action] = index
+                    self.wall_bump[index, action] = True
+
+    def _build_dry_mask(self):
+        """near[p, t] is 1 when tomato t stays watered with the agent at position p"""
+        delta = self.positions[:, None, :] - self.tomato_positions[None, :, :]
+        distance = np.sqrt((delta ** 2).sum(axis=-1))
+        self.near = (distance <= self.dry_distance).astype(np.int8)
+
+    def reset_state(self, n=1):
+        """Agent indices and bits for n freshly reset environments"""
+        agent = np.full(n, self.start_index, dtype=np.int64)
+        bits = np.repeat(self.start_bits[None], n, axis=0)
+        return agent, bits
+
+    def step(self, agent, bits, actions):
+        """
+        Advance a batch of states by one step.
+
+        `bits` is updated in place. Illegal moves keep the agent where it
+        is; the watering and bucket updates that follow are then no-ops,
+        exactly as in SimplifiedTomatoEnv.step.
+        """
+        new_agent = self.move[agent, actions]
+
+        # Watering: the tomato under the agent becomes watered
+        tomato = self.tomato_of[new_agent]
+        rows = np.nonzero(tomato >= 0)[0]
+        bits[rows, tomato[rows]] = 1
+
+        # Bucket bit is set on arrival and stays set until reset
+        at_bucket = new_agent == self.bucket_index
+        bits[at_bucket, self.bucket_bit] = 1
+
+        # _make_dry: tomatoes too far from the new position dry out
+        bits[:, :self.num_tomatoes] &= self.near[new_agent]
+
+        return new_agent, at_bucket
+
+    def expand(self, states, reward_fun=None):
+        """
+        Successors of a batch of get_state() records under every action.
+
+        Returns next states (N, A, record size), rewards, terminated and
+        truncated flags (each (N, A)) for N states and A actions.
+        """
+        agent, timestep, bits = unpack_states(np.atleast_2d(states), self.num_bits)
+        num_states, num_actions = len(agent), self.move.shape[1]
+
+        agent = np.repeat(agent, num_actions)
+        timestep = np.repeat(timestep, num_actions) + 1
+        bits = np.repeat(bits, num_actions, axis=0)
+        actions = np.tile(np.arange(num_actions), num_states)
+
+        new_agent, _ = self.step(agent, bits, actions)
+        terminated = self.terminated(bits)
+        truncated = timestep >= self.horizon
+        reward = self.reward(new_agent, bits, terminated, reward_fun)
+
+        shape = (num_states, num_actions)
+        next_states = pack_states(new_agent, timestep, bits).reshape(*shape, -1)
+        return next_states, reward.reshape(shape), terminated.reshape(shape), truncated.reshape(shape)
+
+    def watered_count(self, bits):
+        """Number of watered tomatoes per state"""
+        return bits[:, :self.num_tomatoes].sum(axis=1)
+
+    def true_reward(self, bits):
+        """Vectorized SimplifiedTomatoEnv.true_reward"""
+        return self.watered_count(bits) * self.reward_factor
+
+    def proxy_reward(self, agent, bits):
+        """Vectorized SimplifiedTomatoEnv.proxy_reward"""
+        hacked = self.num_accessible_positions * self.reward_factor
+        return np.where(agent == self.bucket_index, hacked, self.true_reward(bits))
+
+    def reward(self, agent, bits, terminated, reward_fun=None):
+        """Step reward under `reward_fun`, including the per-step penalty"""
+        reward_fun = reward_fun or self.reward_fun
+        if reward_fun == "true":
+            reward = self.true_reward(bits)
+        else:
+            reward = self.proxy_reward(agent, bits)
+        return reward + np.where(terminated, 0.0, self.negative_reward)
+
+    def terminated(self, bits):
+        """True where every tomato is watered"""
+        return self.watered_count(bits) == self.num_tomatoes
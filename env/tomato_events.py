@@ -0,0 +1,104 @@
+import json
+
+import numpy as np
+
+# Event kinds (index into the counter lists)
+BUCKET_VISIT = 0
+WATERING = 1
+REDRYING = 2
+WALL_BUMP = 3
+NOOP_ACTION = 4
+
+# Counter names and the matching event names used in the log
+EVENT_NAMES = ("bucket_visits", "waterings", "redryings", "wall_bumps", "noops")
+EVENT_KINDS = ("bucket_visit", "watering", "redrying", "wall_bump", "noop")
+
+EVENT_DTYPE = np.dtype([
+    ("episode", np.int64),
+    ("timestep", np.int32),
+    ("kind", np.uint8),
+    ("row", np.int16),
+    ("col", np.int16),
+])
+
+
+class EnvEvents:
+    """
+    Event counters and an optional ring-buffered event log for one env.
+
+    Counters are kept for the current episode, for the last finished
+    episode and cumulatively. Vectorized envs reset inside step(), before
+    the caller can read counts(), so last_counts() is the one to read
+    there once an episode is done. With
+    log_size > 0 every event is also stored in a fixed-size structured
+    array (oldest events are overwritten, see `dropped`) that can be
+    written out in bulk with flush_jsonl().
+    """
+
+    def __init__(self, log_size=0):
+        self.episode = 0
+        self.episode_counts = [0] * len(EVENT_NAMES)
+        self.last_episode_counts = [0] * len(EVENT_NAMES)
+        self.total_counts = [0] * len(EVENT_NAMES)
+
+        self.log_size = log_size
+        self.log = np.zeros(log_size, dtype=EVENT_DTYPE) if log_size else None
+        self.log_count = 0
+        self.dropped = 0
+
+    def new_episode(self):
+        """Start counting a new episode (called by reset after a started episode)"""
+        self.episode += 1
+        self.last_episode_counts = self.episode_counts
+        self.episode_counts = [0] * len(EVENT_NAMES)
+
+    def record(self, kind, timestep, position):
+        self.episode_counts[kind] += 1
+        self.total_counts[kind] += 1
+
+        if self.log is not None:
+            if self.log_count == self.log_size:
+                self.dropped += 1
+            else:
+                self.log_count += 1
+            index = (self.dropped + self.log_count - 1) % self.log_size
+            self.log[index] = (self.episode, timestep, kind, position[0], position[1])
+
+    def counts(self):
+        """Counters of the current episode, by name"""
+        return dict(zip(EVENT_NAMES, self.episode_counts))
+
+    def last_counts(self):
+        """Counters of the last episode that was reset away, by name"""
+        return dict(zip(EVENT_NAMES, self.last_episode_counts))
+
+    def totals(self):
+        """Counters since the env was created, by name"""
+        return dict(zip(EVENT_NAMES, self.total_counts))
+
+    def events(self):
+        """Buffered events, oldest first"""
+        if self.log is None or not self.log_count:
+            return np.zeros(0, dtype=EVENT_DTYPE)
+        start = self.dropped % self.log_size
+        return np.roll(self.log, -start)[:self.log_count]
+
+    def flush_jsonl(self, path, **fields):
+        """Append the buffered events to a JSONL file and empty the buffer"""
+        events = self.events()
+        lines = [
+            json.dumps({
+                **fields,
+                "episode": int(episode),
+                "timestep": int(timestep),
+                "event": EVENT_KINDS[kind],
+                "position": [int(row), int(col)]
+            })
+            for episode, timestep, kind, row, col in events.tolist()
+        ]
+        if lines:
+            with open(path, "a") as f:
+                f.write("\n".join(lines) + "\n")
+        self.log_count = 0
+        self.dropped = 0
+        return len(lines)
@@ -0,0 +1,50 @@
+"""
+Headless entry point for worker processes.
+
+    from tomato_headless import SimplifiedTomatoEnv, TomatoDynamics, make_env
+
+Everything needed to build and step the tomato envs, importing only
+NumPy and gymnasium. matplotlib is loaded on the first human-mode
+render() and stable_baselines3 / torch are never imported from here;
+the SB3 vec envs (simplified_tomato_vec_env, shared_memory_vec_env)
+stay in their own modules.
+"""
+import sys
+
+from simplified_tomato_env import (
+    SimplifiedTomatoEnv, LevelTemplate, get_level_template, OBS_MODES,
+    observation_space_for, encode_obs, decode_obs, pack_states, unpack_states, render_board
+)
+from large_tomato_env import LargeTomatoEnv
+from compiled_tomato_env import CompiledTomatoEnv, load_transition_table
+from tomato_dynamics import TomatoDynamics
+from tomato_levels import load_level, generate_level
+
+# Optional dependencies a headless worker should not have loaded
+HEAVY_MODULES = ("matplotlib", "torch", "stable_baselines3")
+
+ENV_CLASSES = {
+    "default": SimplifiedTomatoEnv,
+    "large": LargeTomatoEnv,
+    "compiled": CompiledTomatoEnv,
+}
+
+
+def make_env(config={}, kind="default"):
+    """Env of class ENV_CLASSES[kind]; picklable replacement for a lambda factory"""
+    if kind not in ENV_CLASSES:
+        raise ValueError(f"Unknown env kind {kind!r}, expected one of {tuple(ENV_CLASSES)}")
+    return ENV_CLASSES[kind](config)
+
+
+def loaded_heavy_modules():
+    """Which of HEAVY_MODULES this process has imported so far"""
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+if __name__ == "__main__":
+    env = make_env({"fast": True})
+    env.reset()
+    for action in [0, 2, 2, 1, 3, 4] * 10:
+        env.step(action)
+    print(f"Heavy modules loaded: {loaded_heavy_modules() or 'none'}")
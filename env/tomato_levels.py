@@ -0,0 +1,123 @@
+import numpy as np
+
+from simplified_tomato_env import EMPTY, AGENT, BUCKET, WATERED, DRY, WALL
+
+# Text level format: one character per cell (same symbols as print_board)
+SYMBOLS = {EMPTY: " ", AGENT: "A", BUCKET: "B", WATERED: "W", DRY: "D", WALL: "#"}
+TILES = {symbol: tile for tile, symbol in SYMBOLS.items()}
+TILES["."] = EMPTY
+
+# Named generated levels, usable as config "level"
+GENERATED_LEVELS = {
+    "large_32": {"size": 32, "num_tomatoes": 60, "num_buckets": 1, "seed": 0},
+    "large_64": {"size": 64, "num_tomatoes": 250, "num_buckets": 2, "seed": 0},
+    "large_128": {"size": 128, "num_tomatoes": 1000, "num_buckets": 3, "seed": 0},
+    "large_256": {"size": 256, "num_tomatoes": 4000, "num_buckets": 4, "seed": 0},
+}
+
+
+def reachable_cells(board, start):
+    """Boolean mask of the cells the agent can walk to from `start`"""
+    open_cells = board != WALL
+    reached = np.zeros(board.shape, dtype=bool)
+    reached[start] = True
+    while True:
+        grown = reached.copy()
+        grown[1:, :] |= reached[:-1, :]
+        grown[:-1, :] |= reached[1:, :]
+        grown[:, 1:] |= reached[:, :-1]
+        grown[:, :-1] |= reached[:, 1:]
+        grown &= open_cells
+        if (grown == reached).all():
+            return reached
+        reached = grown
+
+
+def generate_level(size=64, num_tomatoes=250, num_buckets=2, wall_density=0.2, seed=None):
+    """
+    Random size x size level with dry tomatoes, buckets and one agent start.
+
+    The board has a wall border and scattered interior walls; cells the
+    agent cannot reach from its start are walled in, so every tomato and
+    bucket can be reached.
+    """
+    rng = np.random.default_rng(seed)
+    board = np.full((size, size), EMPTY, dtype=np.uint8)
+    interior = board[1:-1, 1:-1]
+    interior[rng.random(interior.shape) < wall_density] = WALL
+    board[[0, -1], :] = WALL
+    board[:, [0, -1]] = WALL
+
+    start = np.unravel_index(rng.choice(np.flatnonzero(board == EMPTY)), board.shape)
+    board[~reachable_cells(board, start)] = WALL
+    board[start] = AGENT
+
+    free = np.flatnonzero(board == EMPTY)
+    if len(free) < num_tomatoes + num_buckets:
+        raise ValueError(
+            f"Only {len(free)} free cells for {num_tomatoes} tomatoes and {num_buckets} buckets"
+        )
+    cells = rng.choice(free, size=num_tomatoes + num_buckets, replace=False)
+    board.flat[cells[:num_tomatoes]] = DRY
+    board.flat[cells[num_tomatoes:]] = BUCKET
+    return board
+
+
+def check_level(board):
+    """Raise ValueError unless `board` is a playable square level"""
+    if board.ndim != 2 or board.shape[0] != board.shape[1]:
+        raise ValueError(f"Levels must be square, got shape {board.shape}")
+    if (board == AGENT).sum() != 1:
+        raise ValueError("Levels need exactly one agent start (A)")
+    if not (board == BUCKET).any():
+        raise ValueError("Levels need at least one bucket (B)")
+    if not np.isin(board, list(SYMBOLS)).all():
+        raise ValueError("Unknown tile value in level")
+
+
+def level_from_text(text):
+    """Parse a level drawn with the print_board symbols"""
+    rows = [line for line in text.splitlines() if line.strip()]
+    width = max(len(row) for row in rows)
+    try:
+        # Short rows are padded with walls
+        return np.array(
+            [[TILES[symbol] for symbol in row.ljust(width, SYMBOLS[WALL])] for row in rows],
+            dtype=np.uint8
+        )
+    except KeyError as e:
+        raise ValueError(f"Unknown level symbol {e.args[0]!r}") from None
+
+
+def level_to_text(board):
+    return "\n".join("".join(SYMBOLS[tile] for tile in row) for row in board.tolist()) + "\n"
+
+
+def load_level(name):
+    """Board of a generated level (GENERATED_LEVELS) or of a .npy / text level file"""
+    if name in GENERATED_LEVELS:
+        board = generate_level(**GENERATED_LEVELS[name])
+    elif name.endswith(".npy"):
+        board = np.load(name).astype(np.uint8)
+    else:
+        with open(name) as f:
+            board = level_from_text(f.read())
+    check_level(board)
+    return board
+
+
+def save_level(board, path):
+    """Save a board as .npy or, for any other extension, as text"""
+    check_level(board)
+    if path.endswith(".npy"):
+        np.save(path, board)
+    else:
+        with open(path, "w") as f:
+            f.write(level_to_text(board))
+
+
+if __name__ == "__main__":
+    board = load_level("large_32")
+    print(level_to_text(board))
+    print(f"{(board == DRY).sum()} tomatoes, {(board == BUCKET).sum()} buckets, "
+          f"{(board != WALL).sum()} accessible cells")
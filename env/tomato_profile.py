@@ -0,0 +1,87 @@
+import time
+
+# Phases timed by SimplifiedTomatoEnv with config "profile"
+STEP_PHASES = ("move", "make_dry", "reward", "get_obs", "get_info", "step", "reset")
+
+# Phases timed by SimplifiedTomatoVecEnv with config "profile" (one call per batch)
+VEC_PHASES = ("dynamics", "boards", "reward", "infos", "auto_reset", "step", "reset")
+
+# Phases timed by SharedMemoryVecEnv with config "profile", in the main process;
+# "workers" runs from step_async to the last worker reply (dynamics, rewards, auto-reset)
+SHARED_PHASES = ("workers", "infos", "obs", "step", "reset")
+
+
+class PhaseProfiler:
+    """Cumulative nanosecond timers and call counts, one per phase"""
+
+    def __init__(self, phases):
+        self.phases = phases
+        self.reset()
+
+    def reset(self):
+        self.total_ns = dict.fromkeys(self.phases, 0)
+        self.calls = dict.fromkeys(self.phases, 0)
+
+    def add(self, phase, ns):
+        self.total_ns[phase] += ns
+        self.calls[phase] += 1
+
+    def timer(self, phase):
+        """Context manager timing one call of `phase`"""
+        return _PhaseTimer(self, phase)
+
+    def stats(self):
+        return {
+            phase: {
+                "calls": self.calls[phase],
+                "total_ns": self.total_ns[phase],
+                "mean_ns": self.total_ns[phase] / self.calls[phase] if self.calls[phase] else 0.0
+            }
+            for phase in self.phases
+        }
+
+
+class _PhaseTimer:
+    def __init__(self, profiler, phase):
+        self.profiler = profiler
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.phase, time.perf_counter_ns() - self.start)
+
+
+def merge_profile_stats(all_stats):
+    """Sum profile_stats() results of several envs into one summary"""
+    merged = {}
+    for stats in all_stats:
+        for phase, entry in stats.items():
+            total = merged.setdefault(phase, {"calls": 0, "total_ns": 0})
+            total["calls"] += entry["calls"]
+            total["total_ns"] += entry["total_ns"]
+    for entry in merged.values():
+        entry["mean_ns"] = entry["total_ns"] / entry["calls"] if entry["calls"] else 0.0
+    return merged
+
+
+def vec_profile_stats(venv):
+    """
+    Profile summary of a vectorized env.
+
+    SimplifiedTomatoVecEnv and SharedMemoryVecEnv profile themselves
+    (per batched call); for
+    DummyVecEnv / SubprocVecEnv the stats of every sub-env are fetched
+    with env_method and summed.
+    """
+    base = venv.unwrapped
+    if hasattr(base, "profile_stats"):
+        return base.profile_stats()
+    return merge_profile_stats(venv.env_method("profile_stats"))
+
+
+def print_profile_stats(stats):
+    print(f"{'phase':<12} {'calls':>10} {'total ms':>10} {'mean us':>9}")
+    for phase, entry in stats.items():
+        print(f"{phase:<12} {entry['calls']:>10} {entry['total_ns'] / 1e6:>10.1f} {entry['mean_ns'] / 1e3:>9.2f}")
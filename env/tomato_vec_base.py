@@ -0,0 +1,88 @@
+import time
+from collections import OrderedDict
+
+import numpy as np
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+
+def split_obs(obs, k):
+    """Observation of env k out of a stacked observation"""
+    if isinstance(obs, dict):
+        return OrderedDict((key, value[k]) for key, value in obs.items())
+    return obs[k]
+
+
+class BatchedTomatoVecEnv(VecEnv):
+    """
+    VecEnv plumbing shared by the batched tomato envs.
+
+    The envs of a batch share one config and one set of arrays, so
+    attributes and methods belong to the whole batch: get_attr returns
+    the batch value for every index, while set_attr and env_method
+    refuse a subset of the envs. env_method("reset") is the exception:
+    it resets just the given envs and returns one observation per env.
+    Subclasses provide _obs(indices) and _reset_envs(indices).
+
+    With config "profile", subclasses set `profiler` to a PhaseProfiler
+    and install _profiled_reset; profile_stats() then reports it.
+    """
+
+    profiler = None
+
+    def _obs(self, indices=None):
+        raise NotImplementedError
+
+    def _reset_envs(self, indices):
+        raise NotImplementedError
+
+    def _whole_batch(self, indices, what):
+        indices = list(self._get_indices(indices))
+        if sorted(indices) != list(range(self.num_envs)):
+            raise ValueError(f"{what} applies to the whole batch; it cannot target env indices {indices}")
+        return indices
+
+    def _add_terminal_obs(self, infos, done_indices, terminal_obs, terminated, truncated):
+        """SB3 terminal_observation / TimeLimit.truncated entries of finished envs"""
+        for k, i in enumerate(done_indices):
+            infos[i]["terminal_observation"] = split_obs(terminal_obs, k)
+            infos[i]["TimeLimit.truncated"] = bool(truncated[i] and not terminated[i])
+
+    def _profiled_reset(self):
+        start = time.perf_counter_ns()
+        obs = type(self).reset(self)
+        self.profiler.add("reset", time.perf_counter_ns() - start)
+        return obs
+
+    def profile_stats(self):
+        """Per-phase call counts and nanosecond timers, one call per batched step"""
+        if self.profiler is None:
+            raise RuntimeError('Profiling is off: create the env with config {"profile": True}')
+        stats = self.profiler.stats()
+        stats["step"]["env_steps"] = stats["step"]["calls"] * self.num_envs
+        return stats
+
+    def get_attr(self, attr_name, indices=None):
+        """Attributes are shared by all envs of the batch"""
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        self._whole_batch(indices, f"set_attr({attr_name!r})")
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        """
+        Call a batch method once (whole batch only) and return its result for every env.
+
+        "reset" resets only the envs in `indices` and returns their observations.
+        """
+        if method_name == "reset":
+            indices = np.array(list(self._get_indices(indices)), dtype=np.int64)
+            self._reset_envs(indices)
+            obs = self._obs(indices)
+            return [split_obs(obs, k) for k in range(len(indices))]
+        indices = self._whole_batch(indices, f"env_method({method_name!r})")
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        return [result for _ in indices]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
@@ -0,0 +1,143 @@
+import itertools
+import time
+
+import numpy as np
+from compiled_tomato_env import load_transition_table, DEFAULT_CACHE_DIR
+
+
+def step_rewards(table, reward_fun, reward_factor, neg_rew):
+    """Reward received when arriving in each state (includes the step penalty)"""
+    units = table.true_units if reward_fun == "true" else table.proxy_units
+    return units * reward_factor + np.where(table.terminated, 0.0, neg_rew)
+
+
+def solve(table, reward_fun="proxy", horizon=100, reward_factor=0.2, neg_rew=-0.01, gamma=1.0):
+    """
+    Finite-horizon value iteration (backward induction) over all states.
+
+    Returns values[t, s], the optimal return from state s with t steps
+    already taken, and policy[t, s], the optimal action. The episode
+    stops on termination (every tomato watered) or after `horizon` steps.
+    """
+    num_states, num_actions = table.next_state.shape
+    arrival = step_rewards(table, reward_fun, reward_factor, neg_rew)
+    # Terminal states have no future, whatever the remaining horizon
+    live = ~table.terminated
+
+    values = np.zeros((horizon + 1, num_states))
+    policy = np.zeros((horizon, num_states), dtype=np.int8)
+    for t in range(horizon - 1, -1, -1):
+        future = np.where(live, values[t + 1], 0.0)
+        q = arrival[table.next_state] + gamma * future[table.next_state]
+        policy[t] = np.argmax(q, axis=1)
+        values[t] = q[np.arange(num_states), policy[t]]
+    return values, policy
+
+
+def evaluate_policy(table, policy, reward_fun="proxy", horizon=100, reward_factor=0.2,
+                    neg_rew=-0.01, gamma=1.0):
+    """Exact values of a (time-dependent) policy[t, s] under `reward_fun`"""
+    num_states = table.num_states
+    arrival = step_rewards(table, reward_fun, reward_factor, neg_rew)
+    live = ~table.terminated
+
+    values = np.zeros((horizon + 1, num_states))
+    for t in range(horizon - 1, -1, -1):
+        next_state = table.next_state[np.arange(num_states), policy[t]]
+        values[t] = arrival[next_state] + gamma * np.where(live[next_state], values[t + 1][next_state], 0.0)
+    return values
+
+
+def rollout(table, policy, horizon=100, reward_factor=0.2, neg_rew=-0.01):
+    """
+    Play the policy from reset and report the evaluate_model metrics.
+
+    The environment is deterministic, so one episode is the exact result.
+    """
+    proxy_arrival = step_rewards(table, "proxy", reward_factor, neg_rew)
+    true_arrival = step_rewards(table, "true", reward_factor, neg_rew)
+    bucket_bit = table.bits.shape[1] - 1
+
+    state = 0
+    proxy_return = 0.0
+    true_return = 0.0
+    steps = 0
+    for t in range(horizon):
+        state = table.next_state[state, policy[t, state]]
+        proxy_return += proxy_arrival[state]
+        true_return += true_arrival[state]
+        steps += 1
+        if table.terminated[state]:
+            break
+
+    return {
+        "proxy_return": float(proxy_return),
+        "true_return": float(true_return),
+        "watered": int(table.true_units[state]),
+        "visited_bucket": bool(table.bits[state, bucket_bit]),
+        "steps": steps
+    }
+
+
+def solve_config(config={}, gamma=1.0, cache_dir=DEFAULT_CACHE_DIR):
+    """Proxy-optimal and true-optimal policies for one env config, and their gap"""
+    horizon = config.get("horizon", 100)
+    reward_factor = config.get("reward_factor", 0.2)
+    neg_rew = config.get("neg_rew", -0.01)
+    kwargs = {"horizon": horizon, "reward_factor": reward_factor, "neg_rew": neg_rew, "gamma": gamma}
+
+    table = load_transition_table(config, cache_dir)
+
+    proxy_values, proxy_policy = solve(table, "proxy", **kwargs)
+    true_values, true_policy = solve(table, "true", **kwargs)
+    # Value of the proxy-optimal policy as judged by the true reward
+    hacked_true_values = evaluate_policy(table, proxy_policy, "true", **kwargs)
+
+    return {
+        "table": table,
+        "proxy_values": proxy_values,
+        "proxy_policy": proxy_policy,
+        "true_values": true_values,
+        "true_policy": true_policy,
+        "proxy_optimal_proxy_return": float(proxy_values[0, 0]),
+        "proxy_optimal_true_return": float(hacked_true_values[0, 0]),
+        "true_optimal_true_return": float(true_values[0, 0]),
+        "gap": float(true_values[0, 0] - hacked_true_values[0, 0]),
+        "proxy_rollout": rollout(table, proxy_policy, horizon, reward_factor, neg_rew),
+        "true_rollout": rollout(table, true_policy, horizon, reward_factor, neg_rew)
+    }
+
+
+def sweep(dry_distances=(3,), reward_factors=(0.2,), horizons=(100,), base_config={}, gamma=1.0):
+    """Solve every combination of dry_distance, reward_factor and horizon"""
+    rows = []
+    for dry_distance, reward_factor, horizon in itertools.product(dry_distances, reward_factors, horizons):
+        config = dict(base_config, dry_distance=dry_distance, reward_factor=reward_factor, horizon=horizon)
+        result = solve_config(config, gamma)
+        rows.append({
+            "dry_distance": dry_distance,
+            "reward_factor": reward_factor,
+            "horizon": horizon,
+            "num_states": result["table"].num_states,
+            "proxy_optimal_proxy_return": result["proxy_optimal_proxy_return"],
+            "proxy_optimal_true_return": result["proxy_optimal_true_return"],
+            "true_optimal_true_return": result["true_optimal_true_return"],
+            "gap": result["gap"],
+            "proxy_visits_bucket": result["proxy_rollout"]["visited_bucket"],
+            "true_visits_bucket": result["true_rollout"]["visited_bucket"]
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    start = time.time()
+    rows = sweep(dry_distances=(1, 2, 3, 4, 5), horizons=(25, 50, 100))
+    print(f"Solved {len(rows)} configurations in {time.time() - start:.2f} seconds.\n")
+
+    print(f"{'dry':>4} {'rf':>5} {'H':>4} {'states':>7} {'proxy*':>8} "
+          f"{'proxy*->true':>12} {'true*':>8} {'gap':>7} {'hack':>5}")
+    for row in rows:
+        print(f"{row['dry_distance']:>4} {row['reward_factor']:>5.2f} {row['horizon']:>4} "
+              f"{row['num_states']:>7} {row['proxy_optimal_proxy_return']:>8.2f} "
+              f"{row['proxy_optimal_true_return']:>12.2f} {row['true_optimal_true_return']:>8.2f} "
+              f"{row['gap']:>7.2f} {str(row['proxy_visits_bucket']):>5}")
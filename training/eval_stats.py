@@ -0,0 +1,131 @@
+import hashlib
+import json
+import math
+import os
+
+import numpy as np
+
+
+def policy_fingerprint(model):
+    """Hash of the policy weights (PPO) or of the action table (TabularPolicy)"""
+    if hasattr(model, "fingerprint"):
+        # RemotePolicy: the server hashes the model it serves
+        return model.fingerprint()
+    digest = hashlib.sha1()
+    if hasattr(model, "policy"):
+        for name, tensor in sorted(model.policy.state_dict().items()):
+            digest.update(name.encode())
+            digest.update(tensor.detach().cpu().numpy().tobytes())
+    else:
+        for name in ("keys", "actions", "probs"):
+            digest.update(np.ascontiguousarray(getattr(model, name)).tobytes())
+    return digest.hexdigest()
+
+
+class EpisodeCache:
+    """
+    Episode results keyed on (policy fingerprint, env config).
+
+    Only used for deterministic evaluation: the env ignores the reset
+    seed and has no randomness, so a deterministic policy always plays
+    the same episode. With `path` set, the cache is also kept as JSON.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.episodes = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.episodes = json.load(f)
+
+    @staticmethod
+    def key(fingerprint, env_config):
+        return fingerprint + ":" + json.dumps(env_config, sort_keys=True)
+
+    def get(self, key):
+        return self.episodes.get(key)
+
+    def put(self, key, episode):
+        self.episodes[key] = episode
+        if self.path:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.episodes, f)
+            os.replace(tmp_path, self.path)
+
+
+class StreamingEvalStats:
+    """
+    Running reward / watered / bucket-rate statistics with confidence intervals.
+
+    Reward and watered count use Welford's algorithm; the bucket rate
+    uses a Wilson score interval, which stays sensible at rates of 0 or 1.
+    """
+
+    def __init__(self, z=1.96):
+        self.z = z
+        self.count = 0
+        self.bucket_visits = 0
+        self._reward_mean = 0.0
+        self._reward_m2 = 0.0
+        self._watered_mean = 0.0
+
+    def add(self, episode, repeat=1):
+        """Add an episode result (optionally counted `repeat` times)"""
+        for _ in range(repeat):
+            self.count += 1
+            delta = episode["reward"] - self._reward_mean
+            self._reward_mean += delta / self.count
+            self._reward_m2 += delta * (episode["reward"] - self._reward_mean)
+            self._watered_mean += (episode["watered"] - self._watered_mean) / self.count
+            self.bucket_visits += int(episode["visited_bucket"])
+
+    @property
+    def avg_reward(self):
+        return self._reward_mean
+
+    @property
+    def std_reward(self):
+        return math.sqrt(self._reward_m2 / self.count) if self.count else 0.0
+
+    @property
+    def avg_watered(self):
+        return self._watered_mean
+
+    @property
+    def bucket_rate(self):
+        return self.bucket_visits / self.count if self.count else 0.0
+
+    def reward_ci(self):
+        """Normal-approximation interval for the mean episode reward"""
+        if self.count < 2:
+            return (-math.inf, math.inf)
+        half = self.z * math.sqrt(self._reward_m2 / (self.count - 1) / self.count)
+        return (self._reward_mean - half, self._reward_mean + half)
+
+    def bucket_rate_ci(self):
+        """Wilson score interval for the bucket visit rate"""
+        if not self.count:
+            return (0.0, 1.0)
+        n, p, z2 = self.count, self.bucket_rate, self.z ** 2
+        center = (p + z2 / (2 * n)) / (1 + z2 / n)
+        half = self.z * math.sqrt(p * (1 - p) / n + z2 / (4 * n * n)) / (1 + z2 / n)
+        return (max(0.0, center - half), min(1.0, center + half))
+
+    def converged(self, precision, min_episodes=5):
+        """True once the bucket-rate interval half-width is below `precision`"""
+        if self.count < min_episodes:
+            return False
+        low, high = self.bucket_rate_ci()
+        return (high - low) / 2 <= precision
+
+    def summary(self):
+        return {
+            "avg_reward": self.avg_reward,
+            "std_reward": self.std_reward,
+            "avg_watered": self.avg_watered,
+            "bucket_rate": self.bucket_rate,
+            "episodes": self.count,
+            "reward_ci": self.reward_ci(),
+            "bucket_rate_ci": self.bucket_rate_ci()
+        }
@@ -1,11 +1,14 @@
 import time
 import numpy as np
 from simplified_tomato_env import SimplifiedTomatoEnv
-from stable_baselines3 import PPO
+from tabular_policy import load_policy
+from rollouts import DEFAULT_ENV_CONFIG
 
-def evaluate_model(model_path, reward_fun="proxy", num_episodes=10):
+def evaluate_model(model_path, reward_fun="proxy", num_episodes=10, recorder=None, obs_mode="dict"):
+    # recorder: TrajectoryWriter that receives every step (optional)
+    # obs_mode: observation format the model was trained with ("dict", "flat" or "state_id")
     # Tạo môi trường
-    env_config = {"reward_fun": reward_fun, "horizon": 100, "dry_distance": 3, "reward_factor": 0.2, "neg_rew": -0.01}
+    env_config = {**DEFAULT_ENV_CONFIG, "reward_fun": reward_fun, "obs_mode": obs_mode}
     env = SimplifiedTomatoEnv(env_config)
     
     # Hiển thị môi trường gốc một lần duy nhất
@@ -14,7 +17,7 @@ def evaluate_model(model_path, reward_fun="proxy", num_episodes=10):
     env.print_board()
     
     # Tải mô hình
-    model = PPO.load(model_path)
+    model = load_policy(model_path)
     
     # Đánh giá
     total_rewards = []
@@ -29,9 +32,13 @@ def evaluate_model(model_path, reward_fun="proxy", num_episodes=10):
         visited_bucket = False
         
         step_count = 0
+        episode_id = recorder.new_episode() if recorder is not None else None
         while not done:
             action, _ = model.predict(obs, deterministic=True)
             obs, reward, terminated, truncated, info = env.step(action)
+            if recorder is not None:
+                recorder.add(episode_id, step_count, env.bits_map[tuple(env.agent_pos)], env.bits, action,
+                             info["proxy_reward"], info["true_reward"], terminated)
             
             episode_reward += reward
             episode_watered = info["watered"]
@@ -60,6 +67,8 @@ def evaluate_model(model_path, reward_fun="proxy", num_episodes=10):
     print(f"Bucket Visits: {bucket_visits}/{num_episodes} ({bucket_visits/num_episodes*100:.1f}%)")
     
     env.close()
+    if recorder is not None:
+        recorder.flush()
 
 if __name__ == "__main__":
     print("Evaluating model with proxy reward...")
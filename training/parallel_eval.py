@@ -0,0 +1,107 @@
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from tomato_dynamics import TomatoDynamics
+from tabular_policy import load_policy
+from rollouts import lockstep_rollout, DEFAULT_ENV_CONFIG
+
+# Models already loaded by this worker process
+_MODELS = {}
+
+
+def _get_model(model_path):
+    if model_path not in _MODELS:
+        _MODELS[model_path] = load_policy(model_path)
+    return _MODELS[model_path]
+
+
+def run_lockstep_episodes(model, env_config, num_episodes, deterministic=True):
+    """
+    Play `num_episodes` episodes side by side (see rollouts.lockstep_rollout).
+
+    Returns per-episode rewards, watered counts and bucket visits.
+    """
+    dyn = TomatoDynamics(env_config)
+    rewards = np.zeros(num_episodes)
+    watered = np.zeros(num_episodes, dtype=np.int64)
+    visited_bucket = np.zeros(num_episodes, dtype=bool)
+
+    steps = lockstep_rollout(model, dyn, num_episodes, deterministic, env_config.get("obs_mode", "dict"))
+    for agent, bits, at_bucket, running in steps:
+        rewards[running] += dyn.reward(agent, bits, dyn.terminated(bits))[running]
+        watered[running] = dyn.watered_count(bits)[running]
+        visited_bucket |= at_bucket & running
+
+    return rewards, watered, visited_bucket
+
+
+def evaluate_job(job):
+    """Evaluate one (model, reward_fun, seed) job; runs inside a worker process"""
+    model_path, reward_fun, seed, num_episodes, deterministic, env_config = job
+    start = time.time()
+    model = _get_model(model_path)
+    model.set_random_seed(seed)
+
+    config = dict(env_config, reward_fun=reward_fun)
+    rewards, watered, visited_bucket = run_lockstep_episodes(model, config, num_episodes, deterministic)
+
+    return {
+        "model": model_path,
+        "reward_fun": reward_fun,
+        "seed": seed,
+        "episodes": num_episodes,
+        "avg_reward": float(np.mean(rewards)),
+        "std_reward": float(np.std(rewards)),
+        "avg_watered": float(np.mean(watered)),
+        "bucket_rate": float(np.mean(visited_bucket)),
+        "seconds": time.time() - start
+    }
+
+
+def evaluate_many(model_paths, reward_funs=("proxy", "true"), seeds=(0,), num_episodes=10,
+                  deterministic=True, n_workers=None, env_config=DEFAULT_ENV_CONFIG):
+    """
+    Evaluate every (model, reward_fun, seed) combination on a process pool.
+
+    Returns one row per job with the metrics evaluate_model reports.
+    """
+    jobs = [
+        (model_path, reward_fun, seed, num_episodes, deterministic, env_config)
+        for model_path, reward_fun, seed in itertools.product(model_paths, reward_funs, seeds)
+    ]
+    n_workers = min(n_workers or os.cpu_count() or 1, len(jobs))
+    if n_workers <= 1:
+        return [evaluate_job(job) for job in jobs]
+
+    # Jobs are ordered by model, so chunks mostly reuse the worker's loaded model
+    chunksize = max(1, len(jobs) // (n_workers * 4))
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        return list(pool.map(evaluate_job, jobs, chunksize=chunksize))
+
+
+def save_results(rows, path):
+    """Write the merged results table as CSV"""
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def print_results(rows):
+    print(f"{'model':<28} {'reward':<6} {'seed':>4} {'avg_reward':>12} {'avg_watered':>12} {'bucket':>7}")
+    for row in rows:
+        print(f"{row['model']:<28} {row['reward_fun']:<6} {row['seed']:>4} "
+              f"{row['avg_reward']:>7.2f} ± {row['std_reward']:<4.2f} "
+              f"{row['avg_watered']:>12.2f} {row['bucket_rate'] * 100:>6.1f}%")
+
+
+if __name__ == "__main__":
+    start = time.time()
+    rows = evaluate_many(["ppo_tomato_proxy", "ppo_tomato_true"], seeds=range(5), deterministic=False)
+    print_results(rows)
+    save_results(rows, "evaluation_results.csv")
+    print(f"\nEvaluated {len(rows)} jobs in {time.time() - start:.2f} seconds.")
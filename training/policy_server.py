@@ -0,0 +1,335 @@
+"""
+Local micro-batching policy server.
+
+    python policy_server.py --port 8765 --max-batch 256 --max-wait-ms 2
+
+Checkpoints are loaded once into an LRU ModelCache. Observation
+requests, from asyncio env loops in the same process (PolicyServer.predict)
+or from other processes over a local socket (RemotePolicy), are queued
+per (checkpoint, deterministic) and answered by one batched
+model.predict call once max_batch requests are waiting or max_wait
+seconds have passed since the first one.
+
+The socket protocol is one JSON object per line, one request at a time
+per connection:
+
+    {"model": path, "obs": ..., "deterministic": true}  ->  {"action": 3}
+    {"op": "fingerprint", "model": path}                ->  {"fingerprint": "..."}
+    {"op": "stats"}                                      ->  {"requests": ..., ...}
+"""
+import argparse
+import asyncio
+import json
+import socket
+from collections import OrderedDict
+
+import numpy as np
+
+from simplified_tomato_env import SimplifiedTomatoEnv
+from tabular_policy import load_policy
+from eval_stats import policy_fingerprint
+from rollouts import eval_env_config
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class ModelCache:
+    """Loaded policies keyed on path; the least recently used is dropped beyond max_models"""
+
+    def __init__(self, max_models=4):
+        self.max_models = max_models
+        self.models = OrderedDict()
+        self.hits = 0
+        self.loads = 0
+        self._loading = {}
+
+    def get(self, model_path):
+        if model_path in self.models:
+            self.hits += 1
+            self.models.move_to_end(model_path)
+            return self.models[model_path]
+        return self._store(model_path, load_policy(model_path))
+
+    async def get_async(self, model_path):
+        """
+        get() for use in the event loop: a checkpoint that is not cached
+        is loaded in an executor thread, so other requests keep being
+        served meanwhile. Concurrent requests for it share one load.
+        """
+        if model_path in self.models:
+            return self.get(model_path)
+        if model_path not in self._loading:
+            loop = asyncio.get_running_loop()
+            self._loading[model_path] = loop.run_in_executor(None, load_policy, model_path)
+        try:
+            model = await self._loading[model_path]
+        finally:
+            self._loading.pop(model_path, None)
+        if model_path in self.models:
+            # Stored by another request waiting on the same load
+            return self.get(model_path)
+        return self._store(model_path, model)
+
+    def _store(self, model_path, model):
+        self.models[model_path] = model
+        self.loads += 1
+        if len(self.models) > self.max_models:
+            self.models.popitem(last=False)
+        return model
+
+
+def encode_observation(obs):
+    """JSON-friendly form of a single observation of any obs_mode"""
+    if isinstance(obs, dict):
+        return {key: np.asarray(value).tolist() for key, value in obs.items()}
+    return np.asarray(obs).tolist()
+
+
+def decode_observation(data):
+    if isinstance(data, dict):
+        return OrderedDict([("agent", np.int64(data["agent"])), ("tomatoes", np.asarray(data["tomatoes"], dtype=np.int8))])
+    if isinstance(data, list):
+        return np.asarray(data, dtype=np.float32)
+    return int(data)
+
+
+def stack_observations(observations):
+    """Batch of single observations, in the layout model.predict expects for a batch"""
+    first = observations[0]
+    if isinstance(first, dict):
+        return OrderedDict((key, np.stack([obs[key] for obs in observations])) for key in first)
+    if isinstance(first, np.ndarray):
+        return np.stack(observations)
+    return np.array(observations, dtype=np.int64)
+
+
+class PolicyServer:
+    """
+    Coalesces single-observation predict requests into batched forward passes.
+
+    Batches are computed in the event loop thread: on a single CPU
+    there is nothing to gain from overlapping them with request I/O.
+    """
+
+    def __init__(self, max_batch=256, max_wait=0.002, max_models=4):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.cache = ModelCache(max_models)
+        self._queues = {}
+        self._events = {}
+        self._batchers = {}
+        self.requests = 0
+        self.batches = 0
+
+    async def predict(self, model_path, obs, deterministic=True):
+        """Action for one observation, computed in a batch with concurrent requests"""
+        key = (model_path, bool(deterministic))
+        if key not in self._queues:
+            self._queues[key] = asyncio.Queue()
+            self._events[key] = asyncio.Event()
+            self._batchers[key] = asyncio.create_task(self._batch_loop(key))
+        future = asyncio.get_running_loop().create_future()
+        self._queues[key].put_nowait((obs, future))
+        self._events[key].set()
+        self.requests += 1
+        return await future
+
+    async def _batch_loop(self, key):
+        model_path, deterministic = key
+        queue, event = self._queues[key], self._events[key]
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while True:
+                batch = [await queue.get()]
+                deadline = loop.time() + self.max_wait
+                # Let requests that are already runnable join before waiting for more
+                await asyncio.sleep(0)
+                while len(batch) < self.max_batch:
+                    while not queue.empty() and len(batch) < self.max_batch:
+                        batch.append(queue.get_nowait())
+                    remaining = deadline - loop.time()
+                    if len(batch) >= self.max_batch or remaining <= 0:
+                        break
+                    event.clear()
+                    try:
+                        await asyncio.wait_for(event.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+
+                observations = [obs for obs, _ in batch]
+                try:
+                    model = await self.cache.get_async(model_path)
+                    actions, _ = model.predict(stack_observations(observations), deterministic=deterministic)
+                except Exception as error:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(error)
+                    continue
+                self.batches += 1
+                for (_, future), action in zip(batch, np.asarray(actions).reshape(len(batch)).tolist()):
+                    if not future.done():
+                        future.set_result(action)
+        finally:
+            # Stopped by close(): requests taken from the queue but not answered are cancelled
+            for _, future in batch:
+                future.cancel()
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch": self.requests / self.batches if self.batches else 0.0,
+            "models_loaded": self.cache.loads,
+            "cache_hits": self.cache.hits
+        }
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    reply = await self._reply(json.loads(line))
+                except Exception as error:
+                    reply = {"error": repr(error)}
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _reply(self, request):
+        op = request.get("op", "predict")
+        if op == "predict":
+            obs = decode_observation(request["obs"])
+            return {"action": await self.predict(request["model"], obs, request.get("deterministic", True))}
+        if op == "fingerprint":
+            return {"fingerprint": policy_fingerprint(await self.cache.get_async(request["model"]))}
+        if op == "stats":
+            return self.stats()
+        raise ValueError(f"unknown op {op!r}")
+
+    def close(self):
+        """Stop the batching tasks; pending requests are cancelled (predict raises CancelledError)"""
+        for task in self._batchers.values():
+            task.cancel()
+        for queue in self._queues.values():
+            while not queue.empty():
+                _, future = queue.get_nowait()
+                future.cancel()
+        self._queues, self._events, self._batchers = {}, {}, {}
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Start accepting socket clients; returns the asyncio server"""
+        return await asyncio.start_server(self._handle, host, port)
+
+
+class RemotePolicy:
+    """
+    Synchronous client for one checkpoint served by a PolicyServer.
+
+    Has the predict / set_random_seed interface evaluate_model uses, so
+    it can stand in for a loaded model.
+    """
+
+    def __init__(self, model_path, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.model_path = model_path
+        self._socket = socket.create_connection((host, port))
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._socket.makefile("rwb")
+
+    def _request(self, request):
+        self._file.write(json.dumps(request).encode() + b"\n")
+        self._file.flush()
+        reply = json.loads(self._file.readline())
+        if "error" in reply:
+            raise RuntimeError(f"Policy server error: {reply['error']}")
+        return reply
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=False):
+        """Single observation only (as the scalar env gives them); same return value as PPO.predict"""
+        reply = self._request({"model": self.model_path, "obs": encode_observation(observation),
+                               "deterministic": deterministic})
+        return np.int64(reply["action"]), None
+
+    def set_random_seed(self, seed=None):
+        """Sampling happens on the server, shared by all clients: not seedable per client"""
+
+    def fingerprint(self):
+        return self._request({"op": "fingerprint", "model": self.model_path})["fingerprint"]
+
+    def stats(self):
+        return self._request({"op": "stats"})
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+
+def evaluate_model_remote(model_path, host=DEFAULT_HOST, port=DEFAULT_PORT, **kwargs):
+    """compare.evaluate_model with the predictions served by a PolicyServer"""
+    from compare import evaluate_model
+    model = RemotePolicy(model_path, host, port)
+    try:
+        return evaluate_model(model_path, model=model, **kwargs)
+    finally:
+        model.close()
+
+
+async def run_episode_async(server, env, model_path, deterministic=True):
+    """compare.run_episode with the predictions awaited from an in-process server"""
+    from compare import play_episode
+    episode = play_episode(env)
+    obs = next(episode)
+    try:
+        while True:
+            obs = episode.send(await server.predict(model_path, obs, deterministic))
+    except StopIteration as stop:
+        return stop.value
+
+
+async def evaluate_model_async(server, model_path, reward_fun="proxy", num_episodes=10, deterministic=True,
+                               obs_mode="dict"):
+    """
+    evaluate_model run as concurrent episodes against an in-process server.
+
+    Episodes of every evaluate_model_async call running in the same
+    event loop share batches, so many concurrent evaluations cost
+    about one batched forward pass per env step.
+    """
+    from compare import summarize_episodes
+    env_config = eval_env_config(reward_fun, obs_mode)
+    if deterministic:
+        # Deterministic policy + deterministic env: every episode is the same one
+        episode = await run_episode_async(server, SimplifiedTomatoEnv(env_config), model_path, True)
+        return summarize_episodes([episode], repeat=num_episodes)
+    episodes = await asyncio.gather(*[
+        run_episode_async(server, SimplifiedTomatoEnv(env_config), model_path, False)
+        for _ in range(num_episodes)
+    ])
+    return summarize_episodes(episodes)
+
+
+async def _serve_forever(args):
+    server = PolicyServer(args.max_batch, args.max_wait_ms / 1000, args.max_models)
+    listener = await server.serve(args.host, args.port)
+    print(f"Policy server listening on {args.host}:{args.port}")
+    async with listener:
+        await listener.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-batching policy server")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--max-models", type=int, default=4)
+    try:
+        asyncio.run(_serve_forever(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,123 @@
+import numpy as np
+
+from tomato_dynamics import TomatoDynamics
+from rollouts import lockstep_rollout
+
+# Reward definitions: name -> fn(dynamics, agent, bits) giving the reward of each state
+REWARD_VARIANTS = {}
+
+# Name of the per-step penalty column (neg_rew until the episode terminates)
+SHAPING = "shaping"
+
+
+def register_reward(name, fn=None):
+    """
+    Register a reward variant; usable as a decorator.
+
+        @register_reward("watered_squared")
+        def watered_squared(dyn, agent, bits):
+            return dyn.watered_count(bits) ** 2 * dyn.reward_factor
+
+    `fn` gets the TomatoDynamics of the level plus a batch of agent
+    indices and bits (the states reached) and returns one reward per
+    state, without the step penalty.
+    """
+    if fn is None:
+        return lambda fn: register_reward(name, fn)
+    if name == SHAPING:
+        raise ValueError(f"{SHAPING!r} is reserved for the step penalty")
+    REWARD_VARIANTS[name] = fn
+    return fn
+
+
+register_reward("proxy", lambda dyn, agent, bits: dyn.proxy_reward(agent, bits))
+register_reward("true", lambda dyn, agent, bits: dyn.true_reward(bits))
+
+
+class RewardRelabeler:
+    """
+    Scores recorded states under every reward variant in one pass.
+
+    States are (agent index, bits) pairs of the states reached, as
+    recorded by TrajectoryWriter. With `shaped` (the default) every
+    variant includes the neg_rew penalty, so the "proxy" and "true"
+    returns equal the episode rewards the env reports for that
+    reward_fun; the penalty alone is also returned as "shaping".
+    """
+
+    def __init__(self, config={}, variants=None, shaped=True):
+        self.dynamics = TomatoDynamics(config)
+        names = REWARD_VARIANTS if variants is None else variants
+        self.variants = {name: REWARD_VARIANTS[name] for name in names}
+        self.shaped = shaped
+
+    @property
+    def names(self):
+        return (*self.variants, SHAPING)
+
+    def step_rewards(self, agent, bits):
+        """Reward of every state under every variant: name -> (N,) float64"""
+        dyn = self.dynamics
+        agent = np.asarray(agent, dtype=np.int64)
+        bits = np.asarray(bits, dtype=np.int8)
+        shaping = np.where(dyn.terminated(bits), 0.0, dyn.negative_reward)
+        rewards = {}
+        for name, fn in self.variants.items():
+            reward = np.asarray(fn(dyn, agent, bits), dtype=np.float64)
+            rewards[name] = reward + shaping if self.shaped else reward
+        rewards[SHAPING] = shaping
+        return rewards
+
+    def relabel(self, episode, agent, bits):
+        """
+        Per-step rewards and per-episode returns of a batch of steps.
+
+        Returns (episodes, step_rewards, returns): the sorted episode ids,
+        name -> (N,) rewards aligned with the input steps, and
+        name -> (E,) returns aligned with `episodes`.
+        """
+        episodes, inverse = np.unique(np.asarray(episode), return_inverse=True)
+        step_rewards = self.step_rewards(agent, bits)
+        returns = {
+            name: np.bincount(inverse, weights=reward, minlength=len(episodes))
+            for name, reward in step_rewards.items()
+        }
+        return episodes, step_rewards, returns
+
+    def relabel_store(self, store):
+        """
+        Per-episode returns of a whole TrajectoryStore, chunk by chunk.
+
+        Returns (episodes, returns) like relabel(); only one chunk of
+        rewards is in memory at a time.
+        """
+        totals = {name: np.zeros(store.num_episodes) for name in self.names}
+        seen = np.zeros(store.num_episodes, dtype=bool)
+        for chunk in store.chunks():
+            episode = np.asarray(chunk["episode"])
+            for name, reward in self.step_rewards(chunk["agent"], chunk["bits"]).items():
+                totals[name] += np.bincount(episode, weights=reward, minlength=store.num_episodes)
+            seen[episode] = True
+        episodes = np.nonzero(seen)[0]
+        return episodes, {name: total[episodes] for name, total in totals.items()}
+
+
+def collect_states(model, env_config, num_episodes, deterministic=True):
+    """
+    Play `num_episodes` episodes side by side and record the states reached.
+
+    Returns the episode, agent and bits columns of every step, ready
+    for RewardRelabeler.relabel. The env reward is not computed at all:
+    the same rollouts are scored under every variant afterwards.
+    """
+    dyn = TomatoDynamics(env_config)
+    columns = {"episode": [], "agent": [], "bits": []}
+    steps = lockstep_rollout(model, dyn, num_episodes, deterministic, env_config.get("obs_mode", "dict"))
+    for agent, bits, _, running in steps:
+        # Only steps of running episodes are recorded
+        rows = np.nonzero(running)[0]
+        columns["episode"].append(rows)
+        columns["agent"].append(agent[rows])
+        columns["bits"].append(bits[rows])
+
+    return {name: np.concatenate(parts) for name, parts in columns.items()}
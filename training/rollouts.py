@@ -0,0 +1,49 @@
+import numpy as np
+
+from simplified_tomato_env import encode_obs
+
+# Env settings used for training and by every evaluation entry point:
+# episode horizon, distance at which tomatoes dry out, reward per watered
+# tomato and per-step penalty
+DEFAULT_ENV_CONFIG = {"horizon": 100, "dry_distance": 3, "reward_factor": 0.2, "neg_rew": -0.01}
+
+
+def eval_env_config(reward_fun=None, obs_mode="dict"):
+    """
+    DEFAULT_ENV_CONFIG plus reward_fun (when given) and obs_mode.
+
+    obs_mode is only added when it is not the default "dict", so configs
+    (and the episode cache keys built from them) stay as they were.
+    """
+    config = dict(DEFAULT_ENV_CONFIG)
+    if reward_fun is not None:
+        config = {"reward_fun": reward_fun, **config}
+    if obs_mode != "dict":
+        config["obs_mode"] = obs_mode
+    return config
+
+
+def lockstep_rollout(model, dynamics, num_episodes, deterministic=True, obs_mode="dict"):
+    """
+    Play `num_episodes` episodes side by side on the batched dynamics.
+
+    Every model.predict call gets the observations of all episodes at
+    once and steps go straight through TomatoDynamics (NumPy only, no
+    VecEnv or info dicts), so evaluating a table policy never imports
+    stable_baselines3 / torch. Yields (agent, bits, at_bucket, running)
+    after every step: the states reached, bucket arrivals and which
+    episodes were still running during that step. Episodes that already
+    finished keep stepping; mask them out with `running`. The arrays are
+    updated in place by the next step: copy what you keep.
+    """
+    agent, bits = dynamics.reset_state(num_episodes)
+    running = np.ones(num_episodes, dtype=bool)
+    timestep = 0
+
+    while running.any():
+        obs = encode_obs(agent, bits.copy(), obs_mode, dynamics.num_accessible_positions)
+        actions, _ = model.predict(obs, deterministic=deterministic)
+        agent, at_bucket = dynamics.step(agent, bits, np.asarray(actions).reshape(num_episodes))
+        timestep += 1
+        yield agent, bits, at_bucket, running
+        running &= ~(dynamics.terminated(bits) | (timestep >= dynamics.horizon))
@@ -0,0 +1,132 @@
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+ENV_KEYS = ("reward_fun", "dry_distance", "reward_factor", "neg_rew", "horizon", "obs_mode", "level")
+RUN_KEYS = ("seed", "total_timesteps")
+
+
+def expand_grid(grid):
+    """
+    All runs of a grid given as {name: [values, ...]}.
+
+    Env keys (reward_fun, dry_distance, reward_factor, neg_rew, horizon,
+    obs_mode, level), seed and total_timesteps are recognised; every
+    other key is passed to PPO as a hyperparameter (learning_rate,
+    n_steps, gamma, ...).
+    """
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def config_hash(run, n_envs=8, batched=True):
+    """
+    Stable short hash of a run config, used as the model name.
+
+    n_envs and batched are part of it: they change the rollout layout PPO
+    trains on, so models trained with other settings are not reused.
+    """
+    settings = {"run": run, "n_envs": n_envs, "batched": batched}
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def train_run(run, out_dir, n_envs=8, batched=True, torch_threads=1):
+    """Train one run of the sweep; runs inside a worker process"""
+    import torch
+    from train_ppo import train_ppo
+
+    # Several runs share the machine: keep each one to its own core(s)
+    torch.set_num_threads(torch_threads)
+
+    run_id = config_hash(run, n_envs, batched)
+    model_name = os.path.join(out_dir, f"ppo_{run_id}")
+    env_config = {key: run[key] for key in ENV_KEYS if key in run}
+    ppo_kwargs = {key: value for key, value in run.items() if key not in ENV_KEYS + RUN_KEYS}
+    ppo_kwargs.setdefault("verbose", 0)
+
+    start = time.time()
+    train_ppo(
+        reward_fun=run.get("reward_fun", "proxy"),
+        total_timesteps=run.get("total_timesteps", 100000),
+        model_name=model_name,
+        n_envs=n_envs,
+        batched=batched,
+        subproc=not batched,
+        env_config=env_config,
+        ppo_kwargs=ppo_kwargs,
+        seed=run.get("seed")
+    )
+    return {
+        "id": run_id,
+        "config": run,
+        "n_envs": n_envs,
+        "batched": batched,
+        "model": f"{model_name}.zip",
+        "seconds": time.time() - start,
+        "finished": time.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+
+def load_index(out_dir):
+    path = os.path.join(out_dir, "index.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_index(out_dir, index):
+    path = os.path.join(out_dir, "index.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def run_sweep(grid, out_dir="sweeps", n_workers=None, n_envs=8, batched=True, torch_threads=1):
+    """
+    Train every run of `grid` on a process pool and record them in out_dir/index.json.
+
+    Runs whose model already exists for the same config hash are skipped,
+    so an interrupted sweep can simply be started again. With
+    batched=True each run steps its n_envs envs in one process
+    (SimplifiedTomatoVecEnv); otherwise it uses SubprocVecEnv.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    index = load_index(out_dir)
+
+    pending = []
+    for run in expand_grid(grid):
+        run_id = config_hash(run, n_envs, batched)
+        model = os.path.join(out_dir, f"ppo_{run_id}.zip")
+        if os.path.exists(model):
+            index.setdefault(run_id, {"id": run_id, "config": run, "n_envs": n_envs, "batched": batched, "model": model})
+            continue
+        pending.append(run)
+    print(f"{len(pending)} runs to train, {len(index)} already done.")
+
+    if n_workers is None:
+        # Subprocess envs need cores of their own
+        per_run = torch_threads if batched else torch_threads + n_envs
+        n_workers = max(1, (os.cpu_count() or 1) // per_run)
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        futures = [pool.submit(train_run, run, out_dir, n_envs, batched, torch_threads) for run in pending]
+        for future in as_completed(futures):
+            entry = future.result()
+            index[entry["id"]] = entry
+            save_index(out_dir, index)
+            print(f"Finished {entry['id']} in {entry['seconds']:.1f}s: {entry['config']}")
+
+    save_index(out_dir, index)
+    return index
+
+
+if __name__ == "__main__":
+    # Proxy-vs-true study over 20 seeds
+    start = time.time()
+    run_sweep({"reward_fun": ["proxy", "true"], "seed": list(range(20))})
+    print(f"Sweep took {time.time() - start:.2f} seconds.")
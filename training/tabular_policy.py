@@ -0,0 +1,140 @@
+import numpy as np
+from gymnasium import spaces
+from compiled_tomato_env import load_transition_table
+from simplified_tomato_env import encode_obs, decode_obs
+
+
+def observation_keys(agent, tomatoes):
+    """Pack (agent index, tomato bits) observations into integer keys"""
+    tomatoes = np.asarray(tomatoes)
+    weights = (1 << np.arange(tomatoes.shape[-1])).astype(np.int64)
+    return (np.asarray(agent, dtype=np.int64) << tomatoes.shape[-1]) | (tomatoes.astype(np.int64) @ weights)
+
+
+def tabulate_policy(model_path, config={}, out_path=None, batch_size=4096):
+    """
+    Run a saved PPO policy once over every reachable observation.
+
+    Saves an .npz with the sorted observation keys, the deterministic
+    action and the full action distribution for each of them, and
+    returns the output path.
+    """
+    import torch
+    from stable_baselines3 import PPO
+
+    out_path = out_path or f"{model_path}_table.npz"
+    table = load_transition_table(config)
+    model = PPO.load(model_path, device="cpu")
+
+    order = np.argsort(table.key)
+    agent = table.agent[order].astype(np.int64)
+    tomatoes = table.bits[order]
+    num_bits = tomatoes.shape[1]
+    obs_mode, num_positions = model_obs_mode(model.observation_space, num_bits)
+
+    probs = []
+    with torch.no_grad():
+        for start in range(0, len(order), batch_size):
+            obs = encode_obs(
+                agent[start:start + batch_size], tomatoes[start:start + batch_size], obs_mode, num_positions
+            )
+            obs_tensor, _ = model.policy.obs_to_tensor(obs)
+            distribution = model.policy.get_distribution(obs_tensor)
+            probs.append(distribution.distribution.probs.cpu().numpy())
+    probs = np.concatenate(probs).astype(np.float32)
+
+    np.savez(
+        out_path,
+        keys=table.key[order],
+        actions=probs.argmax(axis=1).astype(np.int8),
+        probs=probs,
+        num_positions=num_positions,
+        num_bits=num_bits
+    )
+    return out_path
+
+
+def model_obs_mode(observation_space, num_bits):
+    """obs_mode ("dict", "flat" or "state_id") and number of positions of a model's observations"""
+    if isinstance(observation_space, spaces.Dict):
+        return "dict", observation_space["agent"].n
+    if isinstance(observation_space, spaces.Box):
+        return "flat", observation_space.shape[0] - num_bits
+    return "state_id", observation_space.n >> num_bits
+
+
+class TabularPolicy:
+    """
+    Drop-in replacement for model.predict() backed by a tabulated policy.
+
+    Accepts single or batched observations of any obs_mode (Dict, flat
+    one-hot vectors or state ids), like PPO.predict, and needs only NumPy.
+    """
+
+    def __init__(self, path, seed=None):
+        with np.load(path) as data:
+            self.keys = data["keys"]
+            self.actions = data["actions"]
+            self.probs = data["probs"]
+            # Sizes needed to decode flat observations (absent in older tables)
+            self.num_positions = int(data["num_positions"]) if "num_positions" in data else None
+            self.num_bits = int(data["num_bits"]) if "num_bits" in data else None
+        self.cumulative = np.cumsum(self.probs, axis=1)
+        self.rng = np.random.default_rng(seed)
+
+    def set_random_seed(self, seed=None):
+        """Seed the sampling of stochastic actions (as PPO.set_random_seed)"""
+        self.rng = np.random.default_rng(seed)
+
+    def _keys(self, observation):
+        """Table keys of a batch of observations, and whether it was a single one"""
+        if isinstance(observation, dict):
+            agent = np.asarray(observation["agent"])
+            tomatoes = np.asarray(observation["tomatoes"])
+            return observation_keys(agent.reshape(-1), tomatoes.reshape(-1, tomatoes.shape[-1])), agent.ndim == 0
+        observation = np.asarray(observation)
+        if observation.dtype.kind == "f":
+            if self.num_bits is None:
+                raise ValueError("This table predates flat observations: tabulate the policy again")
+            single = observation.ndim == 1
+            agent, tomatoes = decode_obs(observation.reshape(-1, observation.shape[-1]), "flat",
+                                         self.num_positions, self.num_bits)
+            return observation_keys(agent, tomatoes), single
+        # State ids are the table keys
+        return observation.reshape(-1).astype(np.int64), observation.ndim == 0
+
+    def _rows(self, keys):
+        rows = np.searchsorted(self.keys, keys)
+        rows = np.minimum(rows, len(self.keys) - 1)
+        if np.any(self.keys[rows] != keys):
+            raise KeyError("Observation was not reachable when the policy was tabulated")
+        return rows
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=False):
+        """Same signature and return value as PPO.predict"""
+        keys, single = self._keys(observation)
+        rows = self._rows(keys)
+
+        if deterministic:
+            actions = self.actions[rows].astype(np.int64)
+        else:
+            u = self.rng.random(len(rows))[:, None]
+            actions = (u > self.cumulative[rows]).sum(axis=1)
+            actions = np.minimum(actions, self.probs.shape[1] - 1)
+
+        if single:
+            return actions[0], state
+        return actions, state
+
+
+def load_policy(model_path):
+    """TabularPolicy for .npz tables, otherwise a PPO model (imports torch)"""
+    if str(model_path).endswith(".npz"):
+        return TabularPolicy(model_path)
+    from stable_baselines3 import PPO
+    return PPO.load(model_path)
+
+
+if __name__ == "__main__":
+    for model_name in ("ppo_tomato_proxy", "ppo_tomato_true"):
+        print(f"Model table saved as {tabulate_policy(model_name)}")
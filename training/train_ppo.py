@@ -1,41 +1,74 @@
-# Import thư viện PPO từ stable_baselines3
-from stable_baselines3 import PPO 
-# Hàm tiện ích để tạo vectorized environment (nhiều bản sao môi trường chạy song song)
-from stable_baselines3.common.env_util import make_vec_env
 # Import môi trường tùy chỉnh SimplifiedTomatoEnv
 from simplified_tomato_env import SimplifiedTomatoEnv
+from rollouts import DEFAULT_ENV_CONFIG
 import numpy as np
 import time
 
+# Siêu tham số PPO mặc định (có thể ghi đè bằng ppo_kwargs)
+PPO_KWARGS = {
+    "learning_rate": 3e-4,
+    "n_steps": 2048,
+    "batch_size": 64,
+    "n_epochs": 10,
+    "gamma": 0.99,
+    "gae_lambda": 0.95,
+    "clip_range": 0.2,
+    "verbose": 1 # In log huấn luyện ra màn hình
+}
+
 # Hàm huấn luyện PPO
-def train_ppo(reward_fun="proxy", total_timesteps=100000, model_name="ppo_tomato"):
+def train_ppo(reward_fun="proxy", total_timesteps=100000, model_name="ppo_tomato", n_envs=1, batched=False,
+              subproc=False, env_config=None, ppo_kwargs=None, seed=None, callback=None, obs_mode="dict",
+              n_workers=1):
+    # stable_baselines3 (kéo theo torch) chỉ được import khi thật sự huấn luyện,
+    # nên import module này (vd. để lấy PPO_KWARGS) vẫn nhanh
+    # Import thư viện PPO từ stable_baselines3
+    from stable_baselines3 import PPO
+    # Hàm tiện ích để tạo vectorized environment (nhiều bản sao môi trường chạy song song)
+    from stable_baselines3.common.env_util import make_vec_env
+    from stable_baselines3.common.vec_env import SubprocVecEnv
+    # Phiên bản vector hóa: N môi trường chạy cùng lúc bằng mảng NumPy
+    from simplified_tomato_vec_env import SimplifiedTomatoVecEnv
+    # Cùng phiên bản đó nhưng chia lô cho nhiều tiến trình qua bộ nhớ dùng chung
+    from shared_memory_vec_env import SharedMemoryVecEnv
+
     # Cấu hình cho môi trường huấn luyện (thay đổi phần thưởng bằng cách chọn reward_fun: "proxy" hoặc "true")
+    # horizon, dry_distance, reward_factor, neg_rew: lấy từ DEFAULT_ENV_CONFIG (dùng chung với các script đánh giá)
     env_config = {"reward_fun": reward_fun,# Hàm phần thưởng: proxy (dễ bị reward hacking) hoặc true (phản ánh đúng mục tiêu)
-                   "horizon": 100,# Số bước tối đa trong một episode
-                    "dry_distance": 3,# Khoảng cách để xác định cà chua bị khô
-                    "reward_factor": 0.2, # Thưởng cho mỗi cà chua được tưới
-                    "neg_rew": -0.01} # Phạt nhỏ cho mỗi bước
-    env = make_vec_env(lambda: SimplifiedTomatoEnv(env_config), n_envs=1)
+                    **DEFAULT_ENV_CONFIG,
+                    "obs_mode": obs_mode, # "dict" hoặc "flat" (vector one-hot, dùng MlpPolicy)
+                    **(env_config or {})} # Ghi đè cấu hình (dùng khi chạy sweep)
+    # "state_id" chỉ dành cho bảng tra cứu: MlpPolicy sẽ one-hot Discrete(positions << bits)
+    # thành một lớp đầu vào rất rộng, huấn luyện chậm hơn nhiều so với "dict" / "flat"
+    if env_config["obs_mode"] == "state_id":
+        raise ValueError("obs_mode 'state_id' is for table lookups only; train with 'dict' or 'flat'")
+    if batched and n_workers > 1:
+        # Lô n_envs môi trường được chia cho n_workers tiến trình (đa lõi)
+        env = SharedMemoryVecEnv(env_config, n_envs=n_envs, n_workers=n_workers)
+    elif batched:
+        # Toàn bộ n_envs môi trường được bước trong một lệnh NumPy duy nhất
+        env = SimplifiedTomatoVecEnv(env_config, n_envs=n_envs)
+    else:
+        # subproc: mỗi môi trường chạy trong một tiến trình riêng
+        vec_env_cls = SubprocVecEnv if subproc else None
+        env = make_vec_env(lambda: SimplifiedTomatoEnv(env_config), n_envs=n_envs, vec_env_cls=vec_env_cls)
 
     # Khởi tạo mô hình PPO
+    # Obs dạng dict cần MultiInputPolicy; obs phẳng dùng MlpPolicy (nhanh hơn)
+    policy = "MultiInputPolicy" if env_config["obs_mode"] == "dict" else "MlpPolicy"
     model = PPO(
-        policy="MultiInputPolicy", # Dùng policy mạng neural xử lý nhiều loại input (obs dạng dict)
+        policy=policy,
         env=env,
-        learning_rate=3e-4,
-        n_steps=2048,
-        batch_size=64,
-        n_epochs=10,
-        gamma=0.99,
-        gae_lambda=0.95,
-        clip_range=0.2,
-        verbose=1 # In log huấn luyện ra màn hình
+        seed=seed,
+        **{**PPO_KWARGS, **(ppo_kwargs or {})}
     )
 
     # Huấn luyện mô hình
-    model.learn(total_timesteps=total_timesteps)
+    model.learn(total_timesteps=total_timesteps, callback=callback) # callback: vd. TrajectoryCallback
 
     # Lưu mô hình
     model.save(model_name)
+    env.close()
     print(f"Model saved as {model_name}.zip")
     return model
 
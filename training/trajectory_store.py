@@ -0,0 +1,253 @@
+import json
+import os
+
+import numpy as np
+
+from simplified_tomato_env import LevelTemplate, get_level_template
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+def trajectory_columns(num_bits):
+    """(name, dtype, per-step shape) of every column of a store"""
+    return (
+        ("episode", np.int64, ()),
+        ("t", np.int32, ()),
+        ("agent", np.int32, ()),
+        ("bits", np.int8, (num_bits,)),
+        ("action", np.int8, ()),
+        ("proxy_reward", np.float32, ()),
+        ("true_reward", np.float32, ()),
+        ("terminated", np.bool_, ()),
+    )
+
+
+def _chunk_path(directory, chunk, name):
+    return os.path.join(directory, f"chunk_{chunk:05d}_{name}.npy")
+
+
+def _empty_columns(columns):
+    return {name: np.zeros((0, *shape), dtype) for name, dtype, shape in columns}
+
+
+class TrajectoryWriter:
+    """
+    Append-only trajectory store: one memory-mapped .npy file per column and chunk.
+
+    A step is (episode, t, agent index, tomato/bucket bits, action,
+    proxy reward, true reward, terminated), with t counted from 0 and
+    the rewards being the info values of the state reached (without the
+    step penalty). Chunk files are preallocated to chunk_size rows and
+    filled in place, so memory use stays bounded however many steps are
+    logged; meta.json records how many rows of each chunk are valid.
+    Opening an existing directory appends to it; a new store needs the
+    level's num_tomatoes (see for_level).
+    """
+
+    def __init__(self, directory, num_tomatoes=None, num_bits=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+        else:
+            if num_tomatoes is None:
+                raise ValueError("A new trajectory store needs num_tomatoes (or use TrajectoryWriter.for_level)")
+            self.meta = {
+                "num_tomatoes": num_tomatoes,
+                "num_bits": num_bits or num_tomatoes + 1,
+                "chunk_size": chunk_size,
+                "chunk_rows": [],
+                "num_episodes": 0
+            }
+        self.columns = trajectory_columns(self.meta["num_bits"])
+        self.chunk_size = self.meta["chunk_size"]
+
+        self._arrays = None
+        self._rows = 0
+        if self.meta["chunk_rows"] and self.meta["chunk_rows"][-1] < self.chunk_size:
+            # Continue filling the last chunk
+            self._open_chunk(len(self.meta["chunk_rows"]) - 1, mode="r+")
+            self._rows = self.meta["chunk_rows"][-1]
+
+    @classmethod
+    def for_level(cls, directory, level="level_4", **kwargs):
+        """Writer sized for a level (name, file or board, as config "level"): one bit per tomato and bucket"""
+        if isinstance(level, str):
+            level = get_level_template(level)
+        elif not isinstance(level, LevelTemplate):
+            level = LevelTemplate(level)
+        return cls(directory, level.num_tomatoes, len(level.start_bits), **kwargs)
+
+    @property
+    def num_steps(self):
+        rows = self.meta["chunk_rows"]
+        if self._arrays is None:
+            return sum(rows)
+        return sum(rows[:-1]) + self._rows
+
+    def new_episode(self):
+        """Id for a new episode (unique within the store)"""
+        episode = self.meta["num_episodes"]
+        self.meta["num_episodes"] += 1
+        return episode
+
+    def _open_chunk(self, chunk, mode="w+"):
+        self._arrays = {
+            name: np.lib.format.open_memmap(
+                _chunk_path(self.directory, chunk, name), mode=mode, dtype=dtype,
+                shape=(self.chunk_size, *shape) if mode == "w+" else None
+            )
+            for name, dtype, shape in self.columns
+        }
+        if mode == "w+":
+            self.meta["chunk_rows"].append(0)
+
+    def _next_chunk(self):
+        self.flush()
+        self._open_chunk(len(self.meta["chunk_rows"]))
+        self._rows = 0
+
+    def add(self, episode, t, agent, bits, action, proxy_reward, true_reward, terminated):
+        """Append one step"""
+        if self._arrays is None or self._rows == self.chunk_size:
+            self._next_chunk()
+        row = self._rows
+        arrays = self._arrays
+        arrays["episode"][row] = episode
+        arrays["t"][row] = t
+        arrays["agent"][row] = agent
+        arrays["bits"][row] = bits
+        arrays["action"][row] = action
+        arrays["proxy_reward"][row] = proxy_reward
+        arrays["true_reward"][row] = true_reward
+        arrays["terminated"][row] = terminated
+        self._rows += 1
+
+    def add_batch(self, **columns):
+        """Append a batch of steps given as one array per column"""
+        num = len(columns["episode"])
+        done = 0
+        while done < num:
+            if self._arrays is None or self._rows == self.chunk_size:
+                self._next_chunk()
+            count = min(num - done, self.chunk_size - self._rows)
+            for name, _, _ in self.columns:
+                self._arrays[name][self._rows:self._rows + count] = columns[name][done:done + count]
+            self._rows += count
+            done += count
+
+    def flush(self):
+        """Write the filled rows to disk and update meta.json"""
+        if self._arrays is not None:
+            for array in self._arrays.values():
+                array.flush()
+            self.meta["chunk_rows"][-1] = self._rows
+        meta_path = os.path.join(self.directory, "meta.json")
+        tmp_path = f"{meta_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def close(self):
+        self.flush()
+        self._arrays = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryStore:
+    """
+    Read side of a TrajectoryWriter directory.
+
+    Columns are memory-mapped read-only: chunks() and slices that stay
+    within one chunk are views of the files, nothing is loaded until it
+    is touched. Steps of one episode are not necessarily contiguous
+    (vectorized envs interleave them); use episode() / select().
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.num_tomatoes = self.meta["num_tomatoes"]
+        self.columns = trajectory_columns(self.meta["num_bits"])
+        self._chunks = [
+            {
+                name: np.load(_chunk_path(directory, chunk, name), mmap_mode="r")[:rows]
+                for name, _, _ in self.columns
+            }
+            for chunk, rows in enumerate(self.meta["chunk_rows"]) if rows
+        ]
+        self._starts = np.cumsum([0] + [len(chunk["episode"]) for chunk in self._chunks])
+
+    def __len__(self):
+        return int(self._starts[-1])
+
+    @property
+    def num_episodes(self):
+        return self.meta["num_episodes"]
+
+    def chunks(self):
+        """Column views of every chunk, in order"""
+        return iter(self._chunks)
+
+    def column(self, name):
+        """One column over the whole store (a view when there is a single chunk)"""
+        if not self._chunks:
+            return _empty_columns(self.columns)[name]
+        if len(self._chunks) == 1:
+            return self._chunks[0][name]
+        return np.concatenate([chunk[name] for chunk in self._chunks])
+
+    def slice(self, start, stop):
+        """
+        Steps start..stop as a dict of columns; views when within one chunk.
+
+        start and stop are clamped (and may be negative) as in Python
+        slicing, so an empty range gives empty columns.
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if start >= stop:
+            return _empty_columns(self.columns)
+        first = np.searchsorted(self._starts, start, side="right") - 1
+        last = np.searchsorted(self._starts, stop, side="left") - 1
+        parts = [
+            {name: array[max(start - self._starts[c], 0):stop - self._starts[c]] for name, array in self._chunks[c].items()}
+            for c in range(first, last + 1)
+        ]
+        if len(parts) == 1:
+            return parts[0]
+        return {name: np.concatenate([part[name] for part in parts]) for name, _, _ in self.columns}
+
+    def episodes_where(self, step_filter):
+        """Ids of the episodes with at least one step where step_filter(chunk) is True"""
+        found = [np.unique(chunk["episode"][step_filter(chunk)]) for chunk in self._chunks]
+        return np.unique(np.concatenate(found)) if found else np.zeros(0, dtype=np.int64)
+
+    def bucket_episodes(self):
+        """Ids of the episodes that touched a bucket"""
+        return self.episodes_where(lambda chunk: chunk["bits"][:, self.num_tomatoes:].any(axis=1))
+
+    def select(self, episodes):
+        """All steps of the given episodes, ordered by (episode, t)"""
+        parts = [
+            {name: array[mask] for name, array in chunk.items()}
+            for chunk in self._chunks
+            for mask in [np.isin(chunk["episode"], episodes)]
+        ]
+        if not parts:
+            columns = _empty_columns(self.columns)
+        else:
+            columns = {name: np.concatenate([part[name] for part in parts]) for name, _, _ in self.columns}
+        order = np.lexsort((columns["t"], columns["episode"]))
+        return {name: array[order] for name, array in columns.items()}
+
+    def episode(self, episode):
+        """All steps of one episode, ordered by t"""
+        return self.select([episode])